@@ -5,13 +5,20 @@ Endpoints:
   GET /metadata?type=regions&specimen={specimen_id}
   GET /data/{data_id}
 
+Responses carry a weak ETag derived from the backing file's mtime and size
+(for .zarr tiles: the resolution level's zarr.json); a matching
+If-None-Match yields 304 Not Modified.
+
 See README.md for details.
 """
 
-from fastapi import APIRouter, Query, HTTPException
-from fastapi.responses import JSONResponse, Response
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+import asyncio
+import hashlib
 import logging
-from typing import Literal
+from typing import Dict, Literal
 
 #from ..config import settings
 from ..services.data_service import DataService
@@ -19,22 +26,63 @@ from ..services.data_service import DataService
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-data_service = DataService()
 
+def get_data_service(request: Request) -> DataService:
+    """Dependency returning the app-wide DataService created in main.lifespan."""
+    return request.app.state.data_service
+
+
+def _weak_etag(version: tuple, *parts) -> str:
+    key = ':'.join(map(str, (*parts, *version)))
+    # blake2b: same 128-bit tag length as MD5, cheaper on 64-bit CPUs
+    return 'W/"%s"' % hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def _not_modified(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # weak comparison: ignore the W/ prefix on either side
+    opaque = etag.removeprefix('W/')
+    return any(t.strip().removeprefix('W/') == opaque for t in if_none_match.split(','))
+
+
+_CACHE_CONTROL = 'private, must-revalidate'
+# media type per tile modality, looked up instead of branching per request
+_TILE_MEDIA_TYPES = {'img': 'application/octet-stream', 'msk': 'image/png'}
 
+
+def _cache_headers(etag: str) -> dict:
+    return {'ETag': etag, 'Cache-Control': _CACHE_CONTROL}
+
+
+# Plain `def`: FastAPI runs it in the threadpool, so the stat()/JSON loading
+# below never blocks the event loop (matters on NFS/SSHFS data mounts).
 @router.get('/metadata')
-async def fetch_metadata(
+def fetch_metadata(
+        request: Request,
         type: Literal["specimens", "regions"] = Query(..., description="Metadata type: specimens | regions"),
-        specimen: str | None = Query(None, description="Specimen ID for regions")):
+        specimen: str | None = Query(None, description="Specimen ID for regions"),
+        data_service: DataService = Depends(get_data_service)):
     try:
         if type == 'specimens':
-            specimens = data_service.load_specimens_metadata()
-            return JSONResponse(content=specimens)
+            version, specimens = data_service.get_specimens_json_bytes()
+            etag = _weak_etag(version, type)
+            if _not_modified(request.headers.get('if-none-match'), etag):
+                return Response(status_code=304, headers=_cache_headers(etag))
+            return Response(content=specimens, media_type='application/json',
+                            headers=_cache_headers(etag))
         if type == 'regions':
             if not specimen:
                 raise HTTPException(status_code=400, detail="specimen query param required for regions metadata")
-            regions = data_service.get_regions_metadata(specimen)
-            return JSONResponse(content=regions)
+            etag = _weak_etag(data_service.file_version(data_service.get_regions_path(specimen)),
+                              type, specimen)
+            if _not_modified(request.headers.get('if-none-match'), etag):
+                return Response(status_code=304, headers=_cache_headers(etag))
+            regions = data_service.get_regions_json_bytes(specimen)
+            return Response(content=regions, media_type='application/json',
+                            headers=_cache_headers(etag))
         raise HTTPException(status_code=400, detail="Unsupported metadata type")
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -47,29 +95,85 @@ async def fetch_metadata(
         raise HTTPException(status_code=500, detail="Internal error serving metadata")
 
 
+def _data_response(data_service: DataService, data_id: str, if_none_match: str | None) -> Response:
+    """Blocking part of /data: resolve, revalidate, then read and encode."""
+    failure = data_service.recent_failure(data_id)
+    if failure is not None:
+        raise HTTPException(status_code=404, detail=failure)
+    try:
+        return _resolve_data_response(data_service, data_id, if_none_match)
+    except (FileNotFoundError, KeyError, IndexError) as e:
+        data_service.remember_failure(data_id, e)
+        raise
+
+
+def _resolve_data_response(data_service: DataService, data_id: str, if_none_match: str | None) -> Response:
+    parsed = data_service.parse_data_id(data_id)
+    data_path = data_service.get_data_path(parsed)
+    stat_result = data_path.stat()
+    version = data_service.get_data_version(parsed, data_path, stat_result)
+    # data ids resolve through the specimens metadata (tile size, level and
+    # channel mapping), so its version is part of the tag as well
+    etag = _weak_etag(version, data_id, data_service.get_specimens_version())
+    headers = _cache_headers(etag)
+    if _not_modified(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    media_type = _TILE_MEDIA_TYPES.get(parsed.modality)
+    if media_type is not None:
+        # return raw bytes and let the receiver interpret the format (e.g. float16 raw)
+        # use a generic binary content type instead of forcing jpeg/png
+        bytes_out = data_service.get_tile_bytes(parsed, version)
+        return Response(content=bytes_out, media_type=media_type, headers=headers)
+    if parsed.modality == 'meh':
+        # Meshes are plain files: stream them from disk instead of reading
+        # the whole OBJ into memory first; reuse our stat so it is not repeated.
+        return FileResponse(data_path, media_type='text/plain', headers=headers,
+                            stat_result=stat_result)
+    raise HTTPException(status_code=400, detail='Unsupported modality')
+
+
+# In-flight /data computations keyed by (data_id, If-None-Match); identical
+# requests arriving while one is being served await the same result instead
+# of decoding the tile again.
+_inflight: Dict[tuple, asyncio.Task] = {}
+
+
+async def _coalesced(key: tuple, fn, *args):
+    task = _inflight.get(key)
+    if task is None:
+        # A detached task, awaited by every caller through shield: a
+        # disconnecting client (the first one included) cancels only its own
+        # wait, never the shared computation.
+        task = asyncio.ensure_future(run_in_threadpool(fn, *args))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _inflight_done(key, t))
+    return await asyncio.shield(task)
+
+
+def _inflight_done(key: tuple, task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # mark the exception retrieved even when every caller went away
+    task.cancelled() or task.exception()
+
+
 @router.get('/data/{data_id}')
-async def fetch_data_piece(data_id: str):
+async def fetch_data_piece(data_id: str, request: Request,
+                           data_service: DataService = Depends(get_data_service)):
     try:
-        parsed = data_service.parse_data_id(data_id)
-        if parsed.modality in ('img', 'msk'):
-            bytes_out = data_service.get_tile_bytes(parsed)
-            # return raw bytes and let the receiver interpret the format (e.g. uint16 raw)
-            # use a generic binary content type instead of forcing jpeg/png
-            if parsed.modality == 'img':
-                return Response(content=bytes_out, media_type='application/octet-stream')
-            if parsed.modality == 'msk':
-                return Response(content=bytes_out, media_type='image/png')
-        if parsed.modality == 'meh':
-            mesh_bytes = data_service.get_mesh_bytes(parsed)
-            return Response(content=mesh_bytes, media_type='text/plain')
-        raise HTTPException(status_code=400, detail='Unsupported modality')
+        # h5py/zarr reads and encoding block; keep them off the event loop so
+        # a viewport's burst of tile requests is served concurrently.
+        if_none_match = request.headers.get('if-none-match')
+        return await _coalesced((data_id, if_none_match),
+                                _data_response, data_service, data_id, if_none_match)
+    except HTTPException:
+        raise
     except (ValueError) as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except FileNotFoundError as e:
+    except (FileNotFoundError, IndexError) as e:
         raise HTTPException(status_code=404, detail=str(e))
     except KeyError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        print(e)
         logger.exception("Failed to serve data")
         raise HTTPException(status_code=500, detail='Internal error serving data')
@@ -8,7 +8,7 @@ import os
 from pathlib import Path
 from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import Field, field_validator
 
 class Settings(BaseSettings):
     # Application info
@@ -30,11 +30,40 @@ class Settings(BaseSettings):
         "http://127.0.0.1:5173",
         "http://127.0.0.1:8080",
     ]
+    # Seconds browsers may cache a CORS preflight response
+    cors_max_age: int = 86400
 
     # Data root (specimens metadata + assets)
     data_root_path: Path = Field(default_factory=
         lambda: Path(os.getenv("DATA_ROOT_PATH", "data")))
 
+    # Minimum seconds between modification checks of the specimens file
+    metadata_check_interval: float = 2.0
+
+    # Load metadata and open image files at startup instead of on first request
+    prewarm_on_startup: bool = True
+
+    # Per-worker in-memory cache of encoded tiles (bytes)
+    tile_cache_max_bytes: int = 128 * 1024 * 1024
+    # Threads reading neighbouring tiles ahead of requests; 0 disables prefetching
+    tile_prefetch_workers: int = 0
+    # zlib level for mask tile PNGs (0-9); label masks compress well even at 1
+    png_compress_level: int = 1
+    # Per-worker number of open image files/datasets kept between requests
+    open_handle_cache_size: int = 32
+    # Seconds a not-found /data result is answered from memory; 0 disables
+    negative_cache_ttl: float = 10.0
+    # Per-worker budget of HDF5 chunk caches. Each open .ims dataset gets a cache
+    # sized to the chunks one tile touches, capped at this total divided by
+    # open_handle_cache_size, so all open datasets together stay within it
+    # (worst case 256 MiB per worker, on top of tile_cache_max_bytes)
+    h5_chunk_cache_total_bytes: int = 256 * 1024 * 1024
+
+    @field_validator("cors_origins")
+    @classmethod
+    def _dedupe_cors_origins(cls, v: List[str]) -> List[str]:
+        return list(dict.fromkeys(v))
+
     # Logging
     log_level: str = "INFO"
     log_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -43,6 +72,8 @@ class Settings(BaseSettings):
         env_file=".env",
         case_sensitive=False,
         extra="ignore",
+        # parsed once at import; read-only afterwards
+        frozen=True,
     )
 
 
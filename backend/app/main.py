@@ -2,82 +2,104 @@
 Main FastAPI application for VISoR Platform
 """
 
+import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .middleware.conditional_gzip import ConditionalGZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
 from .config import settings
 from .api import new_api
+from .services.data_service import DataService
 
-# Configure logging
+# Configure logging: handlers only enqueue records; a listener thread formats
+# and writes them, so request handling never blocks on stderr I/O. The
+# listener runs from import to interpreter exit, like the handler, so records
+# logged outside the lifespan are written too and the queue never piles up.
+log_queue = queue.SimpleQueue()
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter(settings.log_format))
+log_listener = logging.handlers.QueueListener(log_queue, _log_stream, respect_handler_level=True)
+_log_queue_handler = logging.handlers.QueueHandler(log_queue)
+_log_queue_handler.setFormatter(logging.Formatter())  # message only; _log_stream adds the rest
 logging.basicConfig(
-    level  = getattr(logging, settings.log_level),
-    format = settings.log_format
+    level    = getattr(logging, settings.log_level),
+    handlers = [_log_queue_handler]
 )
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
+async def prewarm(data_service: DataService):
+    """Load specimens and region metadata in parallel before serving requests."""
+    try:
+        specimens = await asyncio.to_thread(data_service.load_specimens_metadata)
+    except Exception as e:
+        logger.warning("Prewarm skipped: %s", e)
+        return
+    results = await asyncio.gather(
+        *(asyncio.to_thread(data_service.prewarm, sid) for sid in specimens),
+        return_exceptions=True)
+    for sid, result in zip(specimens, results):
+        if isinstance(result, Exception):
+            logger.warning("Prewarm of specimen %s failed: %s", sid, result)
+    logger.info("Prewarmed %d specimens", len(specimens))
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # FastAPI app startup
-    logger.info(f"Starting {settings.app_name}, version {settings.app_version}")
-    logger.info(f"Data path: {settings.data_root_path}")
-    logger.info(f"Debug mode: {settings.debug}")
+    logger.info("Starting %s, version %s", settings.app_name, settings.app_version)
+    logger.info("Data path: %s", settings.data_root_path)
+    logger.info("Debug mode: %s", settings.debug)
+
+    # Single DataService per worker, shared by all routers via Depends()
+    app.state.data_service = DataService()
+    if settings.prewarm_on_startup:
+        await prewarm(app.state.data_service)
     
     yield
     
     # FastAPI app shutdown
-    logger.info(f"Shutting down {settings.app_name} API")
-
-# Create FastAPI application
-app = FastAPI(
-    title       = settings.app_name,
-    version     = settings.app_version,
-    description = settings.app_description,
-    docs_url    = "/docs" if settings.debug else None,
-    redoc_url   = "/redoc" if settings.debug else None,
-    lifespan    = lifespan
-)
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins     = settings.cors_origins,
-    allow_credentials = True,
-    allow_methods     = ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers     = ["*"],
-)
-
-# Enable automatic gzip compression for responses when the client supports it.
-# Minimum size controls when compression is applied (in bytes).
-app.add_middleware(ConditionalGZipMiddleware, minimum_size=1024)
+    app.state.data_service.close()
+    logger.info("Shutting down %s API", settings.app_name)
 
 # Global exception handler
-@app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    # no traceback here: Starlette's ServerErrorMiddleware re-raises after this
+    # handler returns, and the server logs the full traceback once
+    logger.error("Unhandled exception: %s", exc)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
 
 # Health check endpoint
-@app.get("/health")
+# (monotonic time of last check, data root exists); probes hit /health every
+# few seconds, so the stat is repeated at most every HEALTH_CHECK_TTL seconds
+HEALTH_CHECK_TTL = 30.0
+_health_cache = [float('-inf'), False]
+
 async def health_check():
     """Health check endpoint"""
+    now = time.monotonic()
+    if now - _health_cache[0] > HEALTH_CHECK_TTL:
+        _health_cache[:] = [now, settings.data_root_path.exists()]
     return {
         "status": "healthy",
         "version": settings.app_version,
-        "data_root_path_exists": settings.data_root_path.exists()
+        "data_root_path_exists": _health_cache[1]
     }
 
 # Root endpoint
-@app.get("/")
 async def root():
     """Root endpoint"""
     return {
@@ -86,8 +108,43 @@ async def root():
         "docs": "/docs" if settings.debug else "Documentation disabled in production"
     }
 
-# Include redesigned unified endpoints (no /api prefix)
-app.include_router(new_api.router, tags=[settings.app_api_version])
+def create_app() -> FastAPI:
+    """Build the FastAPI application; the single place routes and middleware are registered."""
+    app = FastAPI(
+        title       = settings.app_name,
+        version     = settings.app_version,
+        description = settings.app_description,
+        docs_url    = "/docs" if settings.debug else None,
+        redoc_url   = "/redoc" if settings.debug else None,
+        # the schema is only useful with the docs; never build it in production
+        openapi_url = "/openapi.json" if settings.debug else None,
+        lifespan    = lifespan,
+        default_response_class = ORJSONResponse
+    )
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins     = frozenset(settings.cors_origins),  # hashed per-request lookup
+        allow_credentials = True,
+        allow_methods     = ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers     = ["*"],
+        max_age           = settings.cors_max_age,
+    )
+
+    # Enable automatic gzip compression for responses when the client supports it.
+    # Minimum size controls when compression is applied (in bytes).
+    app.add_middleware(ConditionalGZipMiddleware, minimum_size=1024)
+
+    app.add_exception_handler(Exception, global_exception_handler)
+    app.get("/health")(health_check)
+    app.get("/")(root)
+
+    # Include redesigned unified endpoints (no /api prefix)
+    app.include_router(new_api.router, tags=[settings.app_api_version])
+    return app
+
+app = create_app()
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -95,5 +152,7 @@ if __name__ == "__main__":
         host      = settings.host,
         port      = settings.port,
         reload    = settings.debug,
+        # one access log line per tile request is costly; only log them when debugging
+        access_log = settings.debug,
         log_level = settings.log_level.lower()
     )
@@ -1,61 +1,111 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-import gzip
-from starlette.responses import Response as StarletteResponse
+try:
+    # Intel ISA-L DEFLATE: zlib-compatible API, several times faster (levels 0-3)
+    from isal import isal_zlib as zlib
+except ImportError:
+    import zlib
+from starlette.datastructures import Headers, MutableHeaders
 
 
-class ConditionalGZipMiddleware(BaseHTTPMiddleware):
+class ConditionalGZipMiddleware:
     """Middleware that gzips responses only when:
     - the client sends Accept-Encoding including gzip
     - the response Content-Type starts with 'text/plain'
     - the response is larger than minimum_size
     This keeps binary/image responses untouched while still allowing
     automatic compression for plain-text payloads (e.g. mesh text).
+
+    Implemented as a plain ASGI middleware: responses that are not
+    compressed (e.g. binary tiles) are forwarded message by message without
+    being re-buffered into a new Response object. Compressed bodies are
+    streamed through a single zlib compressor once `minimum_size` bytes have
+    been seen, so large streamed payloads are never held in memory whole.
     """
-    def __init__(self, app, minimum_size: int = 1024):
-        super().__init__(app)
+    def __init__(self, app, minimum_size: int = 1024, compresslevel: int = 1):
+        self.app = app
         self.minimum_size = minimum_size
+        # low levels suit on-the-fly HTTP compression; ISA-L accepts 0-3 only
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        # scan the raw ASGI header bytes; no Headers object or str decoding
+        if not any(name == b'accept-encoding' and b'gzip' in value.lower()
+                   for name, value in scope['headers']):
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        # body chunks held back until it is known whether to compress
+        pending = []
+        pending_size = 0
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, pending_size, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                content_type = headers.get('content-type', '').lower()
+                # Do not re-compress if already encoded; compress text/* and
+                # JSON-like content types (application/json, vendor types, etc.)
+                if headers.get('content-encoding') or not (
+                        content_type.startswith('text/') or 'json' in content_type):
+                    passthrough = True
+                else:
+                    # a declared length below the threshold: no need to buffer
+                    content_length = headers.get('content-length')
+                    passthrough = content_length is not None and content_length.isdigit() \
+                        and int(content_length) < self.minimum_size
+                if passthrough:
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            chunk = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is not None:
+                # streaming: compress each upstream chunk as it arrives
+                out = compressor.compress(chunk)
+                if not more_body:
+                    out += compressor.flush()
+                if out or not more_body:
+                    await send({'type': 'http.response.body', 'body': out, 'more_body': more_body})
+                return
+
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size < self.minimum_size:
+                if more_body:
+                    return
+                await send(start_message)
+                await send({'type': 'http.response.body', 'body': b''.join(pending)})
+                return
+
+            compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 31)  # wbits=31: gzip container
+            body = compressor.compress(b''.join(pending))
+            pending.clear()
+            # copy: the raw header list may belong to a Response shared by
+            # coalesced requests
+            headers = MutableHeaders(raw=list(start_message['headers']))
+            del headers['content-length']
+            headers['Content-Encoding'] = 'gzip'
+            if not more_body:
+                body += compressor.flush()
+                headers['Content-Length'] = str(len(body))
+            # Ensure Vary includes Accept-Encoding
+            vary = headers.get('Vary', '')
+            if 'accept-encoding' not in vary.lower():
+                headers['Vary'] = (vary + ', Accept-Encoding').strip(', ')
+            await send({**start_message, 'headers': headers.raw})
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
 
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-
-        # Do not re-compress if already encoded
-        if response.headers.get('content-encoding'):
-            return response
-
-        accept_encoding = request.headers.get('accept-encoding', '')
-        if 'gzip' not in accept_encoding.lower():
-            return response
-
-        content_type = response.headers.get('content-type', '').lower()
-        # Compress text/* and JSON-like content types (application/json, vendor types, etc.)
-        if not (content_type.startswith('text/') or 'json' in content_type):
-            return response
-
-        # Collect body bytes (handle both pre-rendered and iterator responses)
-        body = b''
-        if getattr(response, 'body', None) is not None:
-            body = response.body
-        else:
-            try:
-                async for chunk in response.body_iterator:
-                    body += chunk
-            except Exception:
-                return response
-
-        if len(body) < self.minimum_size:
-            # Recreate response since body_iterator may have been consumed
-            return StarletteResponse(content=body, status_code=response.status_code,
-                                     headers=dict(response.headers), media_type=response.media_type)
-
-        gzipped = gzip.compress(body)
-
-        headers = dict(response.headers)
-        headers.pop('content-length', None)
-        headers['Content-Encoding'] = 'gzip'
-        # Ensure Vary includes Accept-Encoding
-        vary = headers.get('Vary', '')
-        if 'accept-encoding' not in vary.lower():
-            headers['Vary'] = (vary + ', Accept-Encoding').strip(', ')
-
-        return StarletteResponse(content=gzipped, status_code=response.status_code,
-                                 headers=headers, media_type=response.media_type)
+        await self.app(scope, receive, send_wrapper)
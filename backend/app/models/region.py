@@ -2,11 +2,15 @@
 Data models for brain regions
 """
 
+from bisect import bisect_right
+from itertools import accumulate
 from typing import Dict, List, Optional, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
 class Region(BaseModel):
     """Brain region model"""
+    model_config = ConfigDict(defer_build=True)
+
     id: int
     name: str
     abbreviation: str
@@ -21,77 +25,65 @@ class Region(BaseModel):
 
 class RegionHierarchy(BaseModel):
     """Hierarchical structure of brain regions"""
+    model_config = ConfigDict(defer_build=True)
+
     metadata: Dict[str, Any]
     regions: List[Region]
     hierarchy: Dict[str, Any]
     region_lookup: Dict[str, Region]
-    
+
+    # Derived indexes, built once from `regions` in model_post_init
+    _regions_by_level: Dict[int, List[Region]] = PrivateAttr(default_factory=dict)
+    # lowercased "name\nabbreviation\n" of all regions, and each region's offset in it
+    _search_corpus: str = PrivateAttr(default='')
+    _search_starts: List[int] = PrivateAttr(default_factory=list)
+    _by_value: Dict[int, Region] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        for level in range(1, 5):
+            level_attr = f"level{level}"
+            unique_levels = set()
+            regions = []
+            for region in self.regions:
+                level_value = getattr(region, level_attr)
+                if level_value and level_value not in unique_levels:
+                    unique_levels.add(level_value)
+                    regions.append(region)
+            self._regions_by_level[level] = regions
+        entries = [f"{r.name.lower()}\n{r.abbreviation.lower()}\n" for r in self.regions]
+        self._search_starts = list(accumulate((len(e) for e in entries[:-1]), initial=0))
+        self._search_corpus = ''.join(entries)
+        # first region wins, as with the former linear scan
+        for region in reversed(self.regions):
+            self._by_value[region.value] = region
+
     def get_region_by_id(self, region_id: int) -> Optional[Region]:
         """Get region by ID"""
         return self.region_lookup.get(str(region_id))
     
     def get_region_by_value(self, value: int) -> Optional[Region]:
         """Get region by atlas mask value"""
-        for region in self.regions:
-            if region.value == value:
-                return region
-        return None
+        return self._by_value.get(value)
     
     def search_regions(self, query: str) -> List[Region]:
         """Search regions by name or abbreviation"""
         query_lower = query.lower()
-        matching_regions = []
-        
-        for region in self.regions:
-            if (query_lower in region.name.lower() or 
-                query_lower in region.abbreviation.lower()):
-                matching_regions.append(region)
-        
-        return matching_regions
+        if not query_lower:
+            return list(self.regions)
+        if '\n' in query_lower:
+            return []
+        # str.find over one corpus string instead of two `in` tests per region
+        corpus, starts = self._search_corpus, self._search_starts
+        matches = []
+        pos = corpus.find(query_lower)
+        while pos != -1:
+            index = bisect_right(starts, pos) - 1
+            matches.append(self.regions[index])
+            if index + 1 == len(starts):
+                break
+            pos = corpus.find(query_lower, starts[index + 1])
+        return matches
     
     def get_regions_by_level(self, level: int) -> List[Region]:
         """Get regions by hierarchy level (1-4)"""
-        if level < 1 or level > 4:
-            return []
-        
-        level_attr = f"level{level}"
-        unique_levels = set()
-        regions = []
-        
-        for region in self.regions:
-            level_value = getattr(region, level_attr)
-            if level_value and level_value not in unique_levels:
-                unique_levels.add(level_value)
-                regions.append(region)
-        
-        return regions
-
-class RegionPickResult(BaseModel):
-    """Result of region picking at a coordinate"""
-    specimen_id: str
-    coordinate: Dict[str, int]  # x, y, z coordinates
-    region: Optional[Region] = None
-    region_value: int = 0
-    confidence: float = 1.0
-    
-class RegionStatistics(BaseModel):
-    """Statistics about brain regions"""
-    total_regions: int
-    regions_by_level: Dict[str, int]
-    hierarchy_depth: int
-    coverage_stats: Optional[Dict[str, Any]] = None
-
-class RegionFilter(BaseModel):
-    """Filter for region queries"""
-    level: Optional[int] = Field(None, ge=1, le=4)
-    search_query: Optional[str] = None
-    parent_id: Optional[int] = None
-    include_children: bool = True
-    max_results: int = Field(default=100, ge=1, le=1000)
-
-class RegionResponse(BaseModel):
-    """Response model for region queries"""
-    regions: List[Region]
-    total_count: int
-    filtered_count: int
-    statistics: Optional[RegionStatistics] = None
+        return list(self._regions_by_level.get(level, ()))
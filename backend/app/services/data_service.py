@@ -32,32 +32,70 @@ Limitations / Assumptions:
   - Encoding flag is accepted but presently only .ims raw access is implemented;
     we ignore encoding when reading .ims (could dispatch different optimized
     zarr backends later).
-  - For mask (msk*) we always PNG; for image (img*) JPEG.
+  - For mask (msk*) we always PNG; for image (img*) raw little-endian float16
+    (intensity / 65535), no JPEG.
 
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Dict, Any, Optional, Tuple
-import json
-import re
+import os
 import logging
+import threading
+import time
 import numpy as np
+import orjson
 
 import PIL.Image
 from io import BytesIO
 import h5py
 import zarr
+from zarr.core.buffer import default_buffer_prototype
 
 from ..models.specimen import ViewType
 from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+_ND_BUFFER = default_buffer_prototype().nd_buffer
 
-@dataclass
+# float16(v / 65535) for every uint16 v, computed exactly as the generic
+# float32 path below; a single gather per pixel for 8/16-bit tiles
+_U16_TO_F16 = np.divide(np.arange(65536, dtype=np.uint16), np.float32(65535.0),
+                        dtype=np.float32).astype(np.float16)
+
+# tile dtypes whose every value is exact in float32; see _make_tile_bytes
+_EXACT_IN_F32 = frozenset(map(np.dtype, ('int8', 'int16', 'float16', 'float32')))
+
+# greyscale palette, index i -> (i, i, i); PNG masks carry its first max+1 entries
+_MASK_PALETTE = bytes(np.repeat(np.arange(256, dtype=np.uint8), 3))
+
+
+# view_type token -> ViewType; a flat lookup instead of enum coercion per tile
+_VIEW_TYPES: Dict[str, ViewType] = {
+    'xz': ViewType.HORIZONTAL,
+    'yz': ViewType.SAGITTAL,
+    'xy': ViewType.CORONAL,
+    '3d': ViewType.VOLUMETRIC,
+}
+
+
+# view_type -> (z, y, x, tile_size) -> index into the (z, y, x) volume; 2D
+# views index the slice axis with an int so the tile comes out 2D
+_ROI_BUILDERS = {
+    'xy': lambda z, y, x, ts: (z, slice(y, y + ts[0]), slice(x, x + ts[1])),
+    'yz': lambda z, y, x, ts: (slice(z, z + ts[0]), slice(y, y + ts[1]), x),
+    'xz': lambda z, y, x, ts: (slice(z, z + ts[0]), y, slice(x, x + ts[1])),
+    '3d': lambda z, y, x, ts: (slice(z, z + ts[0]), slice(y, y + ts[1]), slice(x, x + ts[2])),
+}
+
+
+@dataclass(frozen=True, slots=True)
 class ParsedDataId:
     specimen_id: str
     modality:    str  # img | msk | meh
@@ -68,26 +106,19 @@ class ParsedDataId:
     pos_index:   str
 
     def view_explain(self) -> Optional[ViewType]:
-        # Map new tokens to ViewType enum
-        if self.view_type == 'xz':
-            return ViewType.HORIZONTAL
-        if self.view_type == 'yz':
-            return ViewType.SAGITTAL
-        if self.view_type == 'xy':
-            return ViewType.CORONAL
-        if self.view_type == '3d':
-            return ViewType.VOLUMETRIC
-        return None  # unsupported
+        return _VIEW_TYPES.get(self.view_type)  # None if unsupported
 
     def index_tuple(self) -> Tuple[int, int, int]:
-        parts = self.pos_index.split(',') if self.pos_index else []
-        if len(parts) != 3:
+        # locate the two commas directly; no intermediate list or generator
+        s = self.pos_index
+        i = s.find(',')
+        j = s.find(',', i + 1) if i >= 0 else -1
+        if j < 0 or s.find(',', j + 1) >= 0:
             raise ValueError("coords must be z,y,x for img/msk requests")
         try:
-            z, y, x = (int(p) for p in parts)
+            return int(s[:i]), int(s[i + 1:j]), int(s[j + 1:])
         except ValueError as e:
             raise ValueError("coords values must be integers") from e
-        return z, y, x
 
 def FirstValue(d: Dict[str, Any]) -> Any:
     """Helper to get the first value from a dict, or None if empty."""
@@ -101,40 +132,207 @@ def IndexFromROI(roi: Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int], T
 def IndexFromStartSize(start, size):
     return tuple(slice(start[i], start[i]+size[i]) for i in range(len(start)))
 
+class BytesLRU:
+    """Thread-safe LRU mapping of bytes values, bounded by their total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)  # mark as recently used
+            return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._items
+
+    def put(self, key, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._nbytes -= len(old)
+            self._items[key] = value
+            self._nbytes += len(value)
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)  # least recently used
+                self._nbytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._nbytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+
+class HandleLRU:
+    """Thread-safe LRU of open data handles (h5py files/datasets, zarr groups/arrays).
+
+    Evicted handles are not closed explicitly, since another thread may
+    still be reading from one; h5py closes a file once its last reference
+    is dropped. `close()` closes everything at shutdown.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_open(self, key, opener):
+        with self._lock:
+            handle = self._items.get(key)
+            if handle is not None:
+                self._items.move_to_end(key)
+                return handle
+        # open outside the lock; on a race the first handle stored wins
+        handle = opener()
+        with self._lock:
+            existing = self._items.get(key)
+            if existing is not None:
+                self._items.move_to_end(key)
+                return existing
+            self._items[key] = handle
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return handle
+
+    def close(self) -> None:
+        with self._lock:
+            handles = list(self._items.values())
+            self._items.clear()
+        for handle in handles:
+            if isinstance(handle, h5py.File):
+                handle.close()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
 class DataService:
     """Service for redesigned API interactions."""
 
-    def __init__(self, data_root: Path | None = None):
+    # at most this many recent not-found results are remembered
+    _FAILURE_CACHE_SIZE = 1024
+
+    def __init__(self, data_root: Path | None = None,
+                 metadata_check_interval: float | None = None,
+                 prefetch_workers: int | None = None,
+                 negative_cache_ttl: float | None = None):
         # Default to configured data root from settings if not provided
         self.data_root = data_root or settings.data_root_path
-        self._specimens_cache: Optional[Dict[str, Any]] = None
+        # Seconds between checks of the specimens file for modification
+        self.metadata_check_interval = settings.metadata_check_interval \
+            if metadata_check_interval is None else metadata_check_interval
+        # ((st_mtime_ns, st_size), parsed json) of the specimens file, kept
+        # together so readers never pair a document with another version
+        self._specimens: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+        self._specimens_checked_at = float('-inf')
+        # regions file path -> ((st_mtime_ns, st_size), parsed json)
+        self._regions_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        # encoded tiles keyed by request fields + backing file and specimens versions
+        self._tile_cache = BytesLRU(settings.tile_cache_max_bytes)
+        # open image stores and their datasets, keyed by path + file version
+        self._handles = HandleLRU(settings.open_handle_cache_size)
+        # background reads of the tiles around each requested one; 0 disables
+        if prefetch_workers is None:
+            prefetch_workers = settings.tile_prefetch_workers
+        self._prefetch_pool = ThreadPoolExecutor(prefetch_workers, thread_name_prefix='tile-prefetch') \
+            if prefetch_workers > 0 else None
+        self._prefetch_max_pending = 8 * prefetch_workers
+        self._prefetch_pending: set = set()
+        self._prefetch_lock = threading.Lock()
+        # cache key -> (parsed json, serialized bytes); see _json_bytes
+        self._json_bytes_cache: Dict[str, Tuple[Dict[str, Any], bytes]] = {}
+        # data paths resolved from the specimens metadata object `_resolved_for`
+        self._resolved: Dict[tuple, Any] = {}
+        self._resolved_for: Optional[Dict[str, Any]] = None
+        self._resolved_lock = threading.Lock()
+        # data_id -> (expiry, error message) of recent not-found results,
+        # so clients probing past the data edge do not hit the disk each time
+        self.negative_cache_ttl = settings.negative_cache_ttl \
+            if negative_cache_ttl is None else negative_cache_ttl
+        self._failures: OrderedDict = OrderedDict()
+        self._failures_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Release cached metadata; called on application shutdown."""
+        self._specimens = None
+        self._specimens_checked_at = float('-inf')
+        self._regions_cache.clear()
+        self._json_bytes_cache.clear()
+        if self._prefetch_pool is not None:
+            self._prefetch_pool.shutdown(wait=True, cancel_futures=True)
+            self._prefetch_pool = None
+        self._tile_cache.clear()
+        self._handles.close()
+        self._resolved.clear()
+        self._resolved_for = None
+        self._failures.clear()
 
     # -------------------- Metadata Loading --------------------
     def load_specimens_metadata(self) -> Dict[str, Any]:
         """Load specimens metadata and cache it.
 
         The cache is invalidated when the underlying `data_root/specimens` file's
-        modification time changes.
+        modification time or size changes. The file is stat-ed at most once every
+        `metadata_check_interval` seconds, since every tile request looks up
+        its specimen here several times.
         """
-        specimens_file = self.data_root / 'specimens'
-        if not specimens_file.exists():
-            raise FileNotFoundError(f"Specimens metadata file not found: {specimens_file}")
-
-        # Use file mtime to determine whether to reload cache
+        return self._load_specimens()[1]
+
+    def _load_specimens(self) -> Tuple[Tuple[int, int], Dict[str, Any]]:
+        """(version, specimens) as of the last load; see load_specimens_metadata."""
+        now = time.monotonic()
+        cached = self._specimens
+        if cached is not None and \
+                now - self._specimens_checked_at < self.metadata_check_interval:
+            return cached
+
+        specimens_file = self.get_specimens_path()
+        # One stat gives both existence and the (st_mtime_ns, st_size) version
         try:
-            mtime = specimens_file.stat().st_mtime
-        except Exception:
-            # If stat fails for some reason, fallback to reloading when cache is empty
-            mtime = None
-
-        if self._specimens_cache is None or getattr(self, '_specimens_mtime', None) != mtime:
-            with open(specimens_file, 'r', encoding='utf-8') as f:
-                self._specimens_cache = json.load(f)
-            # Store mtime for future invalidation checks
-            self._specimens_mtime = mtime
-            logger.info("Loaded specimens metadata: %d entries (mtime=%s)", len(self._specimens_cache), mtime)
+            version = self.file_version(specimens_file)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Specimens metadata file not found: {specimens_file}") from None
+
+        if cached is None or cached[0] != version:
+            cached = (version, orjson.loads(specimens_file.read_bytes()))
+            self._specimens = cached
+            logger.info("Loaded specimens metadata: %d entries (version=%s)", len(cached[1]), version)
+        self._specimens_checked_at = now
+
+        return cached
+
+    def _json_bytes(self, key: str, obj: Dict[str, Any]) -> bytes:
+        # Serialized once per parsed object; a reload produces a new object
+        # and hence a fresh serialization.
+        cached = self._json_bytes_cache.get(key)
+        if cached is None or cached[0] is not obj:
+            cached = (obj, orjson.dumps(obj))
+            self._json_bytes_cache[key] = cached
+        return cached[1]
+
+    def get_specimens_json_bytes(self) -> Tuple[Tuple[int, int], bytes]:
+        """(version, pre-serialized UTF-8 JSON) of the specimens metadata.
+
+        The version is the one the cached document was loaded at, not a fresh
+        stat, so an ETag built from it always matches the body served.
+        """
+        version, specimens = self._load_specimens()
+        return version, self._json_bytes('specimens', specimens)
 
-        return self._specimens_cache
+    def get_specimens_version(self) -> Tuple[int, int]:
+        """Version of the cached specimens metadata that data requests resolve against."""
+        return self._load_specimens()[0]
 
     def get_specimen_meta(self, specimen_id: str) -> Dict[str, Any]:
         meta = self.load_specimens_metadata().get(specimen_id)
@@ -142,7 +340,10 @@ class DataService:
             raise KeyError(f"Specimen {specimen_id} not found in metadata")
         return meta
 
-    def get_regions_metadata(self, specimen_id: str) -> Dict[str, Any]:
+    def get_specimens_path(self) -> Path:
+        return self.data_root / 'specimens'
+
+    def get_regions_path(self, specimen_id: str) -> Path:
         # For now RM009 maps to CIVM atlas path; Use specimen atlas_reference/specimens field.
         specimen_meta = self.get_specimen_meta(specimen_id)
         atlas_ref = specimen_meta.get('atlas_reference')
@@ -153,39 +354,96 @@ class DataService:
         regions_path = self.data_root / data_provider["pathes"][data_provider['region_list'][0][0]]
         if not regions_path.exists():
             raise FileNotFoundError(f"Regions metadata file not found: {regions_path}")
-        with open(regions_path, 'r', encoding='utf-8') as f:
-            regions_json = json.load(f)
+        return regions_path
+
+    def get_regions_metadata(self, specimen_id: str) -> Dict[str, Any]:
+        return self._load_regions_file(self.get_regions_path(specimen_id))
+
+    def get_regions_json_bytes(self, specimen_id: str) -> bytes:
+        """Regions metadata as pre-serialized UTF-8 JSON."""
+        regions_path = self.get_regions_path(specimen_id)
+        return self._json_bytes(str(regions_path), self._load_regions_file(regions_path))
+
+    def prewarm(self, specimen_id: str) -> None:
+        """Load and serialize the regions metadata of a specimen ahead of use,
+        and open its image/mask files while the handle cache has room."""
+        meta = self.get_specimen_meta(specimen_id)
+        # specimens without an atlas carry no (or an empty) atlas_reference
+        if meta.get('atlas_reference'):
+            self.get_regions_json_bytes(specimen_id)
+        for kind in ('image', 'region_mask'):
+            # tiles are read from the first entry only, see _lookup_image_path
+            entry = FirstValue(meta.get(kind, {}))
+            if not entry:
+                continue
+            for rel_path in entry.get('data_provider', {}).get('pathes', []):
+                if len(self._handles) >= self._handles.max_items:
+                    return
+                img_path = self.data_root / rel_path
+                if img_path.suffix in ('.ims', '.zarr') and img_path.exists():
+                    self._open_store(img_path, self.file_version(img_path))
+
+    def _load_regions_file(self, regions_path: Path) -> Dict[str, Any]:
+        """Load a regions JSON file, reusing the parsed result when unchanged.
+
+        The parsed document is cached in memory, keyed by the JSON file's
+        ``(st_mtime_ns, st_size)``.
+        """
+        st = regions_path.stat()
+        version = (st.st_mtime_ns, st.st_size)
+        cache_key = str(regions_path)
+        cached = self._regions_cache.get(cache_key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        regions_json = orjson.loads(regions_path.read_bytes())
+        logger.info("Parsed regions metadata %s", regions_path)
+        self._regions_cache[cache_key] = (version, regions_json)
         return regions_json
 
     # -------------------- data_id Parsing --------------------
     # Accept new multi-char view tokens (xy|yz|xz|3d). Keep legacy single char (c|s|h|3) for backward compatibility.
-    _IMAGE_TYPE_RE = re.compile(r'^(?P<mod>img|msk|meh)(?P<view>xy|yz|xz|3d|c|s|h|3)(?:-(?P<enc>[A-Za-z0-9_]+))?$')
+    # image_type = {modality}{view_type}[-{encoding}], matched by fixed-width
+    # prefixes instead of a regex; two-letter views take precedence.
+    _MODALITIES = frozenset(('img', 'msk', 'meh'))
+    _VIEWS_2 = frozenset(('xy', 'yz', 'xz', '3d'))
+    _VIEWS_1 = frozenset(('c', 's', 'h', '3'))
+    _DEFAULT_ENCODING = {'img': 'raw', 'msk': 'png', 'meh': 'obj'}
+
+    @classmethod
+    def _split_image_type(cls, token: str) -> Tuple[str, str, Optional[str]]:
+        modality = token[:3]
+        if modality not in cls._MODALITIES:
+            raise ValueError(f"Invalid image_type format: {token}")
+        view = token[3:5]
+        if view not in cls._VIEWS_2:
+            view = token[3:4]
+            if view not in cls._VIEWS_1:
+                raise ValueError(f"Invalid image_type format: {token}")
+        tail = token[3 + len(view):]
+        if not tail:
+            return modality, view, None
+        encoding = tail[1:]
+        if tail[0] != '-' or not (encoding.isascii() and encoding.replace('_', 'a').isalnum()):
+            raise ValueError(f"Invalid image_type format: {token}")
+        return modality, view, encoding
 
     def parse_data_id(self, data_id: str) -> ParsedDataId:
         parts = data_id.split(':')
         if len(parts) != 5:
             raise ValueError("data_id must have 5 colon-separated segments")
         specimen_id, image_type_token, rl_raw, ch_raw, pos_index = parts
-        m = self._IMAGE_TYPE_RE.match(image_type_token)
-        if not m:
-            raise ValueError(f"Invalid image_type format: {image_type_token}")
+        modality, view_type, encoding = self._split_image_type(image_type_token)
         if (not rl_raw.isdecimal()) and rl_raw.strip() != '':
             raise ValueError("resolution_level must be an integer or empty")
         if (not ch_raw.isdecimal()) and ch_raw.strip() != '':
             raise ValueError("channel must be an integer or empty")
-        modality    = m.group('mod')
-        encoding    = m.group('enc')
         if encoding is None:
-            if modality == 'img':
-                encoding = 'raw'  # default for img
-            elif modality == 'msk':
-                encoding = 'png'  # default for msk
-            elif modality == 'meh':
-                encoding = 'obj'  # default for meh
+            encoding = self._DEFAULT_ENCODING[modality]
         return ParsedDataId(
             specimen_id = specimen_id,
             modality    = modality,
-            view_type   = m.group('view'),
+            view_type   = view_type,
             encoding    = encoding,
             res_level   = int(rl_raw) if rl_raw.strip() != '' else None,
             channel     = int(ch_raw) if ch_raw.strip() != '' else None,
@@ -193,8 +451,29 @@ class DataService:
         )
 
     # -------------------- Tile / Mesh Serving --------------------
+    def _cached_resolve(self, key: tuple, resolver, *args):
+        """Memoize a lookup derived from specimen metadata until the specimens file reloads."""
+        specimens = self.load_specimens_metadata()
+        with self._resolved_lock:
+            if self._resolved_for is not specimens:
+                self._resolved.clear()
+                self._resolved_for = specimens
+            resolved = self._resolved.get(key)
+        if resolved is None:
+            resolved = resolver(*args)
+            with self._resolved_lock:
+                if self._resolved_for is specimens:
+                    self._resolved[key] = resolved
+        return resolved
+
     def _resolve_image_path(self, specimen_id: str, modality: str, view_type: str,
-                            res_level: int, channel: int) -> Path:
+                            res_level: int, channel: int) -> Tuple[Path, Tuple]:
+        return self._cached_resolve(
+            ('image', specimen_id, modality, view_type, res_level, channel),
+            self._lookup_image_path, specimen_id, modality, view_type, res_level, channel)
+
+    def _lookup_image_path(self, specimen_id: str, modality: str, view_type: str,
+                           res_level: int, channel: int) -> Tuple[Path, Tuple]:
         meta = self.get_specimen_meta(specimen_id)
         if modality == 'img':
             images = meta.get('image', {})
@@ -216,18 +495,25 @@ class DataService:
         if not ok:
             raise FileNotFoundError(f"No matching {modality} data for view '{view_type}' at level {res_level} channel {channel} in specimen {specimen_id}")
         img_path = self.data_root / pathes[fidx]
+        # checked once, when resolved; the version stat/open of each read
+        # still fails for a file removed later
         if not img_path.exists():
             raise FileNotFoundError(f"File not found: {img_path}")
         res_lv_idx = res_lv_list.index(res_level)
         if img_path.suffix == '.zarr':
             param = (str(res_lv_idx), channel)
         elif img_path.suffix == '.ims':
-            param = ('DataSet', f'ResolutionLevel {res_lv_idx}', 'TimePoint 0', f'Channel {channel}', 'Data')
+            # full dataset path, formatted once here rather than joined per tile
+            param = (f'DataSet/ResolutionLevel {res_lv_idx}/TimePoint 0/Channel {channel}/Data',)
         else:
             raise ValueError(f"Unsupported image file format: {img_path.suffix}")
         return img_path, param
 
-    def _get_tile_size(self, specimen_id: str, modality: str, view_type: str) -> int:
+    def _get_tile_size(self, specimen_id: str, modality: str, view_type: str) -> Tuple[int, ...]:
+        return self._cached_resolve(('tile_size', specimen_id, modality, view_type),
+                                    self._lookup_tile_size, specimen_id, modality, view_type)
+
+    def _lookup_tile_size(self, specimen_id: str, modality: str, view_type: str) -> Tuple[int, ...]:
         meta = self.get_specimen_meta(specimen_id)
         if modality == 'img':
             images = meta.get('image', {})
@@ -244,45 +530,107 @@ class DataService:
         else:
             raise ValueError("Invalid view_type for tile size")
 
-    def _read_tile(self, img_path: Path, view_type: str, param: Tuple) -> np.ndarray:
+    def _open_array(self, img_path: Path, param: Tuple, version: Optional[Tuple[int, int]] = None,
+                    tile_size: Tuple[int, ...] = ()):
+        """Dataset (.ims) or array (.zarr) addressed by `param`, from the handle cache.
+
+        Handles are keyed by the data version (see `_image_version`), so a
+        replaced file or regenerated level is reopened.
+        `tile_size` sizes the chunk cache of a newly opened .ims dataset.
+        """
+        if version is None:
+            version = self._image_version(img_path, param)
+        path_key = (str(img_path), version)
+        store = self._open_store(img_path, version)
+        if img_path.suffix == '.ims':
+            dataset_path = param[0]
+            return self._handles.get_or_open(path_key + (dataset_path,),
+                                             lambda: self._open_h5_dataset(store, dataset_path, tile_size))
+        return self._handles.get_or_open(path_key + (param[0],), lambda: store[param[0]])
+
+    def _open_store(self, img_path: Path, version: Tuple[int, int]):
+        """Open .ims file or .zarr group, from the handle cache."""
+        path_key = (str(img_path), version)
+        if img_path.suffix == '.ims':
+            # read-only server: skip HDF5 file locking (fcntl calls; breaks on some NFS mounts)
+            return self._handles.get_or_open(path_key, lambda: h5py.File(img_path, 'r', locking=False))
+        if img_path.suffix == '.zarr':
+            # the group only wraps the directory; its arrays are keyed by
+            # their own level version in _open_array
+            return self._handles.get_or_open((str(img_path),), lambda: zarr.open(img_path, mode='r'))
+        raise ValueError(f"Unsupported image file format: {img_path.suffix}")
+
+    @staticmethod
+    def _open_h5_dataset(h5f: h5py.File, dataset_path: str, tile_size: Tuple[int, ...]) -> h5py.Dataset:
+        """Open a dataset with a chunk cache that holds all chunks one 2D tile touches.
+
+        HDF5 decompresses whole chunks even for a sub-chunk ROI. With the
+        default 1 MiB cache those chunks are dropped before the next tile
+        or slice is read, so scrolling through z decompresses each chunk
+        again per slice; sized from `.chunks`, they stay cached instead.
+        zarr needs no equivalent: sharded arrays are read per inner chunk.
+        """
+        dataset = h5f[dataset_path]
+        chunks = dataset.chunks
+        if chunks is None or len(chunks) != 3 or len(tile_size) != 2:
+            return dataset
+        # chunks touched by an unaligned tile, worst case over the xy/yz/xz planes
+        n_chunks = max((-(-tile_size[0] // chunks[a]) + 1) * (-(-tile_size[1] // chunks[b]) + 1)
+                       for a, b in ((1, 2), (0, 1), (0, 2)))
+        # the handle LRU keeps at most open_handle_cache_size datasets open,
+        # so their caches together stay within the total budget
+        nbytes = min(n_chunks * int(np.prod(chunks)) * dataset.dtype.itemsize,
+                     settings.h5_chunk_cache_total_bytes // max(1, settings.open_handle_cache_size))
+        if nbytes <= dataset.id.get_access_plist().get_chunk_cache()[1]:
+            return dataset
+        # HDF5 ignores the access list while the dataset is still open
+        del dataset
+        dapl = h5py.h5p.create(h5py.h5p.DATASET_ACCESS)
+        # ~100 hash slots per cached chunk, as HDF5 recommends; w0 default
+        dapl.set_chunk_cache(100 * n_chunks + 1, nbytes, 0.75)
+        return h5py.Dataset(h5py.h5d.open(h5f.id, dataset_path.encode(), dapl=dapl))
+
+    def _read_tile(self, img_path: Path, view_type: str, param: Tuple,
+                   version: Optional[Tuple[int, int]] = None) -> np.ndarray:
         zyx = param[-2]
         tile_size_0 = param[-1]
-        if view_type == "xy":
-            tile_size = (1, tile_size_0[0], tile_size_0[1])
-            roi = [slice(zyx[i], zyx[i] + tile_size[i]) for i in range(3)]
-            roi[0] = zyx[0]
-        elif view_type == "yz":
-            tile_size = (tile_size_0[0], tile_size_0[1], 1)
-            roi = [slice(zyx[i], zyx[i] + tile_size[i]) for i in range(3)]
-            roi[2] = zyx[2]
-        elif view_type == "xz":
-            tile_size = (tile_size_0[0], 1, tile_size_0[1])
-            roi = [slice(zyx[i], zyx[i] + tile_size[i]) for i in range(3)]
-            roi[1] = zyx[1]
-        elif view_type == "3d":
-            tile_size = tile_size_0
-            roi = [slice(zyx[i], zyx[i] + tile_size[i]) for i in range(3)]
-        else:
+        build_roi = _ROI_BUILDERS.get(view_type)
+        if build_roi is None:
             raise ValueError(f"Unsupported view_type: {view_type}")
+        roi = build_roi(*zyx, tile_size_0)
         #print(f"Reading tile from {img_path} at {roi} for view {view_type}")
+        # negative starts would index from the far end of the volume; tiles
+        # beyond the upper edges stay allowed (clipped/zero-padded)
+        if (zyx[0] | zyx[1] | zyx[2]) < 0:
+            raise IndexError(f"Tile origin {zyx} has negative coordinates")
+        array = self._open_array(img_path, param[:-2], version, tile_size_0)
         if img_path.suffix == '.ims':
-            with h5py.File(img_path, 'r') as h5f:
-                harray = h5f[param[0]][param[1]][param[2]][param[3]][param[4]]
-                tile = harray[tuple(roi)]
+            tile = array[roi]
         elif img_path.suffix == '.zarr':
-            zf = zarr.open(img_path, mode='r')
-            za = zf[param[0]]
-            tile = za[param[1], *roi]
-            #print(tile.shape, tile_size, tile_size_0)
-            if tile.shape != tile_size_0:
-                tile1 = tile
-                tile = np.full(tile_size_0, 0, dtype=tile.dtype)
-                tile[IndexFromStartSize(np.zeros_like(tile1.shape), tile1.shape)] = tile1
+            tile = self._read_zarr_tile(array, (param[1], *roi), tile_size_0)
         else:
             raise ValueError(f"Unsupported image file format: {img_path.suffix}")
         return tile
 
-    def get_tile_bytes(self, parsed: ParsedDataId) -> bytes:
+    @staticmethod
+    def _read_zarr_tile(array, selection: Tuple, tile_shape: Tuple[int, ...]) -> np.ndarray:
+        """Read `selection` from a zarr array as a `tile_shape` tile.
+
+        Tiles crossing the array edge are zero-padded by decoding straight
+        into the in-bounds part of a preallocated zero tile, instead of
+        reading a smaller array and copying it over.
+        """
+        extent = tuple(max(0, min(sel.stop, n) - sel.start)
+                       for sel, n in zip(selection, array.shape) if isinstance(sel, slice))
+        if extent == tuple(tile_shape):
+            return array[selection]
+        tile = np.zeros(tile_shape, dtype=array.dtype)
+        if all(extent):
+            inner = tile[tuple(slice(0, e) for e in extent)]
+            array.get_basic_selection(selection, out=_ND_BUFFER.from_numpy_array(inner))
+        return tile
+
+    def _validate_tile_request(self, parsed: ParsedDataId) -> None:
         if parsed.modality not in ('img', 'msk'):
             raise ValueError("get_tile_bytes only for img/msk modalities")
         view_type = parsed.view_explain()
@@ -292,37 +640,130 @@ class DataService:
             raise ValueError("resolution_level required for img/msk requests")
         if parsed.channel is None and parsed.modality == 'img':
             raise ValueError("channel required for img requests")
+
+    def get_tile_bytes(self, parsed: ParsedDataId, version: Optional[Tuple[int, int]] = None) -> bytes:
+        """Encoded tile for `parsed`.
+
+        `version` (see `file_version`) identifies the backing file state;
+        when given, results are served from / stored in the tile LRU, and
+        a cache miss schedules prefetching of the neighbouring tiles.
+        """
+        self._validate_tile_request(parsed)
+        if version is None:
+            return self._make_tile_bytes(parsed)
+        key = self._tile_key(parsed, version)
+        tile_bytes = self._tile_cache.get(key)
+        if tile_bytes is None:
+            tile_bytes = self._make_tile_bytes(parsed, version)
+            self._tile_cache.put(key, tile_bytes)
+            if self._prefetch_pool is not None:
+                self._schedule_prefetch(parsed, version)
+        return tile_bytes
+
+    def _tile_key(self, parsed: ParsedDataId, version: Tuple[int, int]) -> tuple:
+        # the specimens version covers changed tile sizes and level/channel mappings
+        return (parsed.specimen_id, parsed.modality, parsed.view_type, parsed.encoding,
+                parsed.res_level, parsed.channel, parsed.pos_index, version,
+                self.get_specimens_version())
+
+    def _neighbor_tiles(self, parsed: ParsedDataId) -> list:
+        """Tiles one tile away in the view plane and one slice away across it."""
+        tile_size = self._get_tile_size(parsed.specimen_id, parsed.modality, parsed.view_type)
+        if parsed.view_type == 'xy':
+            steps = (1, tile_size[0], tile_size[1])
+        elif parsed.view_type == 'yz':
+            steps = (tile_size[0], tile_size[1], 1)
+        elif parsed.view_type == 'xz':
+            steps = (tile_size[0], 1, tile_size[1])
+        else:
+            return []
+        origin = parsed.index_tuple()
+        neighbors = []
+        for axis in range(3):
+            for sign in (-1, 1):
+                zyx = list(origin)
+                zyx[axis] += sign * steps[axis]
+                if zyx[axis] >= 0:
+                    neighbors.append(replace(parsed, pos_index='%d,%d,%d' % tuple(zyx)))
+        return neighbors
+
+    def _schedule_prefetch(self, parsed: ParsedDataId, version: Tuple[int, int]) -> None:
+        for neighbor in self._neighbor_tiles(parsed):
+            key = self._tile_key(neighbor, version)
+            if key in self._tile_cache:
+                continue
+            with self._prefetch_lock:
+                # bounded: under load, prefetching gives way to real requests
+                if key in self._prefetch_pending or \
+                        len(self._prefetch_pending) >= self._prefetch_max_pending:
+                    continue
+                self._prefetch_pending.add(key)
+            try:
+                self._prefetch_pool.submit(self._prefetch_tile, neighbor, version, key)
+            except RuntimeError:  # pool shut down
+                with self._prefetch_lock:
+                    self._prefetch_pending.discard(key)
+                return
+
+    def _prefetch_tile(self, parsed: ParsedDataId, version: Tuple[int, int], key: tuple) -> None:
+        try:
+            if key not in self._tile_cache:
+                self._tile_cache.put(key, self._make_tile_bytes(parsed, version))
+        except Exception as e:
+            logger.debug("Prefetch of %s failed: %s", key, e)
+        finally:
+            with self._prefetch_lock:
+                self._prefetch_pending.discard(key)
+
+    def _make_tile_bytes(self, parsed: ParsedDataId, version: Optional[Tuple[int, int]] = None) -> bytes:
         channel = parsed.channel
         z, y, x = parsed.index_tuple()
         tile_size = self._get_tile_size(parsed.specimen_id, parsed.modality, parsed.view_type)
         img_path, param = self._resolve_image_path(parsed.specimen_id, parsed.modality,
                                                    parsed.view_type, parsed.res_level, channel)
-        tile = self._read_tile(img_path, parsed.view_type, param + ((z,y,x), tile_size))
+        tile = self._read_tile(img_path, parsed.view_type, param + ((z,y,x), tile_size), version)
         if parsed.modality == 'img':
             if not parsed.encoding == 'raw':
                 raise ValueError("Only raw encoding supported for img")
             #img = np.clip(tile - 100, 0, 65500)          # remove background
-            print(tile.max(), tile.min(), tile.dtype)
-            img = tile / 65535.0
-            img_fp32 = img.astype(np.float32)
-            img_fp16 = img_fp32.astype(np.float16)
-            print(img_fp16.max(), img_fp16.min(), img_fp16.dtype)
-            return img_fp16.tobytes()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("tile %s: max=%s min=%s dtype=%s", parsed, tile.max(), tile.min(), tile.dtype)
+            if tile.dtype == np.uint16 or tile.dtype == np.uint8:
+                return _U16_TO_F16.take(tile).tobytes()
+            if tile.dtype in _EXACT_IN_F32:
+                # Divide directly in float32 (no float64 temporary); for inputs
+                # exact in float32 this is bit-identical to the float64 divide
+                # + float32 cast, as double rounding is innocuous for division
+                # at these precisions.
+                img_fp32 = np.divide(tile, np.float32(65535.0), dtype=np.float32)
+            else:
+                # wider ints / float64 would be rounded before the divide
+                img_fp32 = (tile / 65535.0).astype(np.float32)
+            return img_fp32.astype(np.float16).tobytes()
         elif parsed.modality == 'msk':
             if not parsed.encoding == 'png':
                 raise ValueError("Only PNG encoding supported for msk")
             # For mask, we assume PNG encoding; tile is uint16 labels
             # Convert to uint8 for PNG (may lose some labels if >255)
             assert tile.dtype == np.uint8
-            msk_uint8 = tile
-            img_pil = PIL.Image.fromarray(msk_uint8, mode='P')
+            msk_uint8 = np.ascontiguousarray(tile)
+            # Wrap the buffer as a 'P' image without a copy. An explicit
+            # palette is required: without one Pillow writes a 1-entry PLTE
+            # and packs the labels to 1 bit. Trimming it to the labels in use
+            # lets Pillow pick the smallest lossless bit depth (1/2/4/8).
+            img_pil = PIL.Image.frombuffer('P', msk_uint8.shape[::-1], msk_uint8, 'raw', 'P', 0, 1)
+            img_pil.putpalette(_MASK_PALETTE[:3 * (int(msk_uint8.max()) + 1)])
             with BytesIO() as output:
-                img_pil.save(output, format="PNG")
+                img_pil.save(output, format="PNG", compress_level=settings.png_compress_level)
                 return output.getvalue()
         else:
             raise ValueError("Unsupported modality in get_tile_bytes")
 
     def _resolve_mesh_path(self, specimen_id: str, region_id: str) -> Path:
+        return self._cached_resolve(('mesh', specimen_id, region_id),
+                                    self._lookup_mesh_path, specimen_id, region_id)
+
+    def _lookup_mesh_path(self, specimen_id: str, region_id: str) -> Path:
         meta = self.get_specimen_meta(specimen_id)
         meshes = meta.get('mesh', {})
         if not meshes:
@@ -345,6 +786,65 @@ class DataService:
             raise FileNotFoundError(f"Mesh file not found: {mesh_path}")
         return mesh_path
 
+    def recent_failure(self, data_id: str) -> Optional[str]:
+        """Message of the not-found error `data_id` raised within the TTL, if any."""
+        with self._failures_lock:
+            entry = self._failures.get(data_id)
+        if entry is None or time.monotonic() >= entry[0]:
+            return None
+        return entry[1]
+
+    def remember_failure(self, data_id: str, exc: Exception) -> None:
+        if self.negative_cache_ttl <= 0:
+            return
+        with self._failures_lock:
+            # only the message: rebuilding the exception could drop attributes
+            # (OSError.filename), and re-raising one instance grows its traceback
+            self._failures[data_id] = (time.monotonic() + self.negative_cache_ttl, str(exc))
+            self._failures.move_to_end(data_id)
+            while len(self._failures) > self._FAILURE_CACHE_SIZE:
+                self._failures.popitem(last=False)
+
+    @staticmethod
+    def file_version(path: Path, stat_result: Optional[os.stat_result] = None) -> Tuple[int, int]:
+        """(st_mtime_ns, st_size) of `path`, used for cache keys and ETags."""
+        st = stat_result if stat_result is not None else path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    def _image_version(self, img_path: Path, param: Tuple,
+                       stat_result: Optional[os.stat_result] = None) -> Tuple[int, int]:
+        """Version of the image data addressed by `param`; see `file_version`.
+
+        A .zarr store is a directory whose own stat does not change when chunk
+        data is rewritten, so its level's ``zarr.json`` is used instead. That
+        catches a regenerated level; chunks rewritten in place are noticed only
+        once the level's ``zarr.json`` is touched as well.
+        """
+        if img_path.suffix == '.zarr':
+            return self.file_version(img_path / param[0] / 'zarr.json')
+        return self.file_version(img_path, stat_result)
+
+    def get_data_version(self, parsed: ParsedDataId, data_path: Path,
+                         stat_result: Optional[os.stat_result] = None) -> Tuple[int, int]:
+        """Version of the data served for `parsed` from `data_path` (see
+        `get_data_path`), for cache keys and ETags."""
+        if parsed.modality in ('img', 'msk'):
+            _, param = self._resolve_image_path(parsed.specimen_id, parsed.modality,
+                                                parsed.view_type, parsed.res_level, parsed.channel)
+            return self._image_version(data_path, param, stat_result)
+        return self.file_version(data_path, stat_result)
+
+    def get_data_path(self, parsed: ParsedDataId) -> Path:
+        """Return the file (or .zarr directory) backing a data_id."""
+        if parsed.modality in ('img', 'msk'):
+            self._validate_tile_request(parsed)
+            img_path, _ = self._resolve_image_path(parsed.specimen_id, parsed.modality,
+                                                   parsed.view_type, parsed.res_level, parsed.channel)
+            return img_path
+        if parsed.modality == 'meh':
+            return self._resolve_mesh_path(parsed.specimen_id, parsed.pos_index)
+        raise ValueError("Unsupported modality")
+
     def get_mesh_bytes(self, parsed: ParsedDataId) -> bytes:
         mesh_path = self._resolve_mesh_path(parsed.specimen_id, parsed.pos_index)
         return mesh_path.read_bytes()
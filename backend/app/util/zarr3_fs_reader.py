@@ -10,14 +10,28 @@ import logging
 from dataclasses import dataclass
 from typing import Literal, Tuple, Any
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import threading
 import argparse
 
 import numpy as np
 import zarr
 from numcodecs import Blosc
+try:
+    # uses the SSE4.2 / ARMv8 CRC32C instructions
+    from google_crc32c import value as crc32c
+except ImportError:
+    try:
+        from crc32c import crc32c
+    except ImportError:
+        crc32c = None
 
 UINT64_MAX = np.int64(-1).astype(np.uint64)
+UINT32_MAX = np.uint32(0xFFFFFFFF)
+
+def is_empty_chunk(offset, nbytes) -> bool:
+    # empty chunks have all-ones offset and nbytes, in uint64 or narrowed uint32 indexes
+    return offset == nbytes == np.iinfo(offset.dtype).max
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -81,7 +95,7 @@ def coor_to_shard_chunk_index(coor, shard_sz, chunk_sz):
 def IndexFromStartSize(start, size):
     return tuple(slice(start[i], start[i]+size[i]) for i in range(len(start)))
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ZarrMeta:
     shape: Tuple[int, ...]
     shard_sz: Tuple[int, ...]
@@ -94,19 +108,35 @@ class ZarrMeta:
     fill_value: Any
 
 class zarr3_reader:
-    def __init__(self, zarr_path: str, max_cache_items: int = 10000):
+    def __init__(self, zarr_path: str, max_cache_items: int = 10000, max_open_shards: int = 64,
+                 decode_workers: int = 0, verify_index: bool = False):
         self.zarr_path = Path(zarr_path)
         if not self.zarr_path.exists():
             raise FileNotFoundError(f"Zarr path {self.zarr_path} does not exist.")
         if not (self.zarr_path / 'zarr.json').exists():
             raise FileNotFoundError(f"Zarr metadata file {self.zarr_path / 'zarr.json'} does not exist.")
         
+        # check each shard index against its crc32c when first read
+        if verify_index and crc32c is None:
+            raise ImportError("verify_index requires the google-crc32c or crc32c package.")
+        self.verify_index = verify_index
+
         # cache index array, map shard index to index_array
         self._index_array_cache = OrderedDict()
         self._max_cache_items = max_cache_items
 
         # cache meta, map res_lv to meta
         self._meta_cache = {}
+
+        # open shard files, map shard key to unbuffered file; read with os.pread
+        # so threads can share one file without seek races
+        self._shard_files = OrderedDict()
+        self._max_open_shards = max_open_shards
+
+        # threads decoding the chunks of one read_chunks call; numcodecs'
+        # Blosc releases the GIL when called off the main thread
+        self._decode_pool = ThreadPoolExecutor(decode_workers, thread_name_prefix='zarr3-decode') \
+            if decode_workers > 0 else None
         
         # lock for cache access
         self._lock = threading.RLock()
@@ -154,6 +184,13 @@ class zarr3_reader:
         with self._lock:
             self._index_array_cache.clear()
             self._meta_cache.clear()
+            self._shard_files.clear()  # files close once no reader holds them
+
+    def close(self):
+        self.clear_cache()
+        if self._decode_pool is not None:
+            self._decode_pool.shutdown(wait=True)
+            self._decode_pool = None
 
     def _get_meta(self, res_lv: str) -> ZarrMeta:
         with self._lock:
@@ -163,12 +200,44 @@ class zarr3_reader:
                 self._meta_cache[res_lv] = meta
             return meta
 
+    def _get_shard_file(self, shard_key, shard_path):
+        """Open shard file from the LRU; None if the shard does not exist."""
+        with self._lock:
+            shard_fd = self._shard_files.get(shard_key)
+            if shard_fd is not None:
+                self._shard_files.move_to_end(shard_key)  # mark as recently used
+                return shard_fd
+        try:
+            shard_fd = open(shard_path, 'rb', buffering=0)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            existing = self._shard_files.get(shard_key)
+            if existing is not None:
+                shard_fd.close()
+                return existing
+            self._shard_files[shard_key] = shard_fd
+            # evicted files are not closed here: another thread may still be
+            # reading; they close when the last reference is dropped
+            while len(self._shard_files) > self._max_open_shards:
+                self._shard_files.popitem(last=False)
+        return shard_fd
+
     def _read_index_array(self, meta, shard_fd):
-        # intentionally skip checking file size and crc32c check for performance consideration
-        shard_fd.seek(-meta.index_array_bytes-meta.crc_nbytes, os.SEEK_END)
-        index_array = np.frombuffer(shard_fd.read(meta.index_array_bytes),
-                                    dtype=np.uint64) \
+        # intentionally skip checking file size for performance consideration;
+        # crc32c is checked only with verify_index (cheap with hardware CRC)
+        fd = shard_fd.fileno()
+        index_offset = os.fstat(fd).st_size - meta.index_array_bytes - meta.crc_nbytes
+        raw = os.pread(fd, meta.index_array_bytes + meta.crc_nbytes, index_offset)
+        if self.verify_index and \
+                crc32c(raw[:meta.index_array_bytes]) != int.from_bytes(raw[meta.index_array_bytes:], 'little'):
+            raise ValueError("Shard index crc32c mismatch.")
+        index_array = np.frombuffer(raw, dtype=np.uint64, count=meta.index_array_bytes // 8) \
                         .reshape(meta.index_array_shape)
+        # shards under 4 GiB: keep a uint32 copy, halving the cached size; the
+        # all-ones empty marker truncates to the uint32 all-ones marker
+        if index_array.max(where=index_array != UINT64_MAX, initial=0) < UINT32_MAX:
+            index_array = index_array.astype(np.uint32)
         return index_array
 
     def _get_index_array(self, meta, shard_fd, shard_key):
@@ -193,35 +262,88 @@ class zarr3_reader:
         if any(r != 0 for r in residual):
             raise NotImplementedError("Reading partial chunks is not supported.")
 
-        shard_path = self.zarr_path.joinpath(res_lv , 'c' , *map(str, s_idx))
-        if not shard_path.exists():
+        shard_key = (res_lv, s_idx)
+        shard_fd = self._get_shard_file(
+            shard_key, self.zarr_path.joinpath(res_lv , 'c' , *map(str, s_idx)))
+        if shard_fd is None:
             if b_decode:
                 return np.full(meta.chunk_sz, meta.fill_value, dtype=meta.dtype)
             return None
 
-        shard_key = (res_lv, s_idx)
-        with open(shard_path, 'rb') as shard_fd:
-            index_array = self._get_index_array(meta, shard_fd, shard_key)
+        index_array = self._get_index_array(meta, shard_fd, shard_key)
 
-            offset, nbytes = index_array[tuple(c_idx)]
-            if offset == UINT64_MAX and nbytes == UINT64_MAX:
-                if b_decode:
-                    img = np.full(meta.chunk_sz, meta.fill_value, dtype=meta.dtype)
-                else:
-                    img = None
+        offset, nbytes = index_array[tuple(c_idx)]
+        if is_empty_chunk(offset, nbytes):
+            if b_decode:
+                img = np.full(meta.chunk_sz, meta.fill_value, dtype=meta.dtype)
             else:
-                # intentionally skip checking offset and nbytes for performance consideration
-                shard_fd.seek(int(offset), os.SEEK_SET)
-                raw_data = shard_fd.read(int(nbytes))
-                if b_decode:
-                    img = np.frombuffer(meta.compressor.decode(raw_data), dtype=meta.dtype) \
-                          .reshape(meta.chunk_sz)
-                    # TODO: tolerate_corruption
-                else:
-                    img = raw_data
+                img = None
+        else:
+            # intentionally skip checking offset and nbytes for performance consideration
+            raw_data = os.pread(shard_fd.fileno(), int(nbytes), int(offset))
+            if b_decode:
+                img = np.frombuffer(meta.compressor.decode(raw_data), dtype=meta.dtype) \
+                      .reshape(meta.chunk_sz)
+                # TODO: tolerate_corruption
+            else:
+                img = raw_data
         return img
 
-    # TODO: consider batch reading
+    def read_chunks(self, res_lv: str, coors: list, b_decode: bool = True) -> list:
+        """Read several chunks, in the order of `coors`.
+
+        Chunks are grouped by shard and read in file order; chunks stored
+        back to back in a shard are fetched with a single pread.
+        """
+        meta = self._get_meta(res_lv)
+        by_shard = {}
+        for i, coor in enumerate(coors):
+            if len(coor) != len(meta.shard_sz):
+                raise ValueError(f"Coordinate dimension {len(coor)} does not match data dimension {len(meta.shard_sz)}.")
+            s_idx, c_idx, residual = coor_to_shard_chunk_index(coor, meta.shard_sz, meta.chunk_sz)
+            if any(r != 0 for r in residual):
+                raise NotImplementedError("Reading partial chunks is not supported.")
+            by_shard.setdefault(s_idx, []).append((i, c_idx))
+
+        raws = [None] * len(coors)
+        for s_idx, items in by_shard.items():
+            shard_key = (res_lv, s_idx)
+            shard_fd = self._get_shard_file(
+                shard_key, self.zarr_path.joinpath(res_lv , 'c' , *map(str, s_idx)))
+            if shard_fd is None:
+                continue
+            index_array = self._get_index_array(meta, shard_fd, shard_key)
+            ranges = []
+            for i, c_idx in items:
+                offset, nbytes = index_array[tuple(c_idx)]
+                if not is_empty_chunk(offset, nbytes):
+                    ranges.append((int(offset), int(nbytes), i))
+            ranges.sort()
+            j = 0
+            while j < len(ranges):
+                # extend the read over the following adjacent chunks
+                start = ranges[j][0]
+                end = start + ranges[j][1]
+                k = j + 1
+                while k < len(ranges) and ranges[k][0] == end:
+                    end += ranges[k][1]
+                    k += 1
+                buf = memoryview(os.pread(shard_fd.fileno(), end - start, start))
+                for offset, nbytes, i in ranges[j:k]:
+                    raws[i] = buf[offset - start:offset - start + nbytes]
+                j = k
+
+        if not b_decode:
+            return [None if raw is None else bytes(raw) for raw in raws]
+
+        def decode(raw):
+            if raw is None:
+                return np.full(meta.chunk_sz, meta.fill_value, dtype=meta.dtype)
+            return np.frombuffer(meta.compressor.decode(raw), dtype=meta.dtype).reshape(meta.chunk_sz)
+
+        if self._decode_pool is not None and len(raws) > 1:
+            return list(self._decode_pool.map(decode, raws))
+        return [decode(raw) for raw in raws]
 
     def exists_chunk(self, res_lv: str, coor: tuple) -> bool:
         meta = self._get_meta(res_lv)
@@ -232,19 +354,19 @@ class zarr3_reader:
         if any(r != 0 for r in residual):
             raise NotImplementedError("Reading partial chunks is not supported.")
 
-        shard_path = self.zarr_path.joinpath(res_lv , 'c' , *map(str, s_idx))
-        if not shard_path.exists():
+        shard_key = (res_lv, s_idx)
+        shard_fd = self._get_shard_file(
+            shard_key, self.zarr_path.joinpath(res_lv , 'c' , *map(str, s_idx)))
+        if shard_fd is None:
             return False
 
-        shard_key = (res_lv, s_idx)
-        with open(shard_path, 'rb') as shard_fd:
-            index_array = self._get_index_array(meta, shard_fd, shard_key)
+        index_array = self._get_index_array(meta, shard_fd, shard_key)
 
-            offset, nbytes = index_array[tuple(c_idx)]
-            if offset == UINT64_MAX and nbytes == UINT64_MAX:
-                return False
-            else:
-                return True
+        offset, nbytes = index_array[tuple(c_idx)]
+        if is_empty_chunk(offset, nbytes):
+            return False
+        else:
+            return True
 
     def validate(self, mode: Literal['full_read', 'size']):
         # validate through transversing all chunks
@@ -267,7 +389,7 @@ class zarr3_reader:
                     data_sz = 0
                     for c_idx in np.ndindex(index_array.shape[:-1]):
                         offset, nbytes = index_array[c_idx]
-                        if offset == UINT64_MAX and nbytes == UINT64_MAX:
+                        if is_empty_chunk(offset, nbytes):
                             continue
                         cnt_chunks += 1
                         if mode == 'size':
@@ -279,7 +401,7 @@ class zarr3_reader:
                             img = img.reshape(meta.chunk_sz)
                             data_sz += len(raw_data)
                         except Exception as e:
-                            logger.error(f"Error reading chunk at shard {s_idx}, chunk {c_idx} in res_lv {res_lv.name}: {e}")
+                            logger.error("Error reading chunk at shard %s, chunk %s in res_lv %s: %s", s_idx, c_idx, res_lv.name, e)
                 t2 = time.time()
                 sz_rate = data_sz / (1024*1024)
                 if cnt_chunks > 0:
@@ -336,7 +458,7 @@ def main():
     zarr_path = data_root / args.zarr_rel
 
     if args.mode == "whole":
-        logger.info(f"Running whole-dataset validation on {zarr_path}")
+        logger.info("Running whole-dataset validation on %s", zarr_path)
         read_whole_test(zarr_path)
         return
 
@@ -356,7 +478,7 @@ def main():
         else:
             zyx = (0, 0, 0)
 
-    logger.info(f"Testing single chunk at (channel={c}, z={zyx[0]}, y={zyx[1]}, x={zyx[2]}) in res_lv={res_lv}")
+    logger.info("Testing single chunk at (channel=%d, z=%d, y=%d, x=%d) in res_lv=%s", c, *zyx, res_lv)
     test_zarr3_reader(zarr_path, str(res_lv), (c, *zyx))
 
 
@@ -0,0 +1,65 @@
+import sys, os, gzip
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import FastAPI  # noqa
+from fastapi.responses import Response, StreamingResponse  # noqa
+from fastapi.testclient import TestClient  # noqa
+
+from app.middleware.conditional_gzip import ConditionalGZipMiddleware  # noqa
+
+TEXT = b'v 1 2 3\n' * 512
+BINARY = bytes(range(256)) * 16
+
+app = FastAPI()
+app.add_middleware(ConditionalGZipMiddleware, minimum_size=1024)
+
+
+@app.get('/text')
+def text():
+    return Response(content=TEXT, media_type='text/plain')
+
+
+@app.get('/small')
+def small():
+    return Response(content=b'{}', media_type='application/json')
+
+
+@app.get('/stream')
+def stream():
+    return StreamingResponse(iter([TEXT[:100], TEXT[100:2000], TEXT[2000:]]), media_type='text/plain')
+
+
+@app.get('/binary')
+def binary():
+    return Response(content=BINARY, media_type='application/octet-stream')
+
+
+client = TestClient(app)
+
+
+def test_text_is_gzipped():
+    r = client.get('/text', headers={'Accept-Encoding': 'gzip'})
+    assert r.headers['content-encoding'] == 'gzip'
+    assert 'Accept-Encoding' in r.headers['vary']
+    assert r.content == TEXT  # httpx decodes transparently
+    assert int(r.headers['content-length']) < len(TEXT)
+
+
+def test_small_and_binary_untouched():
+    r = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in r.headers and r.content == b'{}'
+    r = client.get('/binary', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in r.headers and r.content == BINARY
+
+
+def test_no_accept_encoding():
+    r = client.get('/text', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in r.headers and r.content == TEXT
+
+
+def test_streamed_text_is_gzipped():
+    r = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert r.headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in r.headers
+    assert r.content == TEXT
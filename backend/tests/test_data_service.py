@@ -0,0 +1,344 @@
+"""Tests for DataService internals that do not need the large image data.
+
+Each test builds a tiny data root under tmp_path with a `specimens` file and
+an atlas regions JSON, so caching behaviour can be checked offline.
+"""
+
+import sys, os, json, io
+import h5py
+import numpy as np
+import PIL.Image
+import pytest
+import zarr
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.data_service import BytesLRU, DataService, _U16_TO_F16  # noqa
+
+
+def make_data_root(root, regions=None):
+    specimens = {
+        'S1': {'id': 'S1', 'atlas_reference': 'A1'},
+        'A1': {
+            'id': 'A1',
+            'regions': {
+                'civm': {
+                    'data_provider': {
+                        'pathes': ['atlas/regions.json'],
+                        'region_list': [[0]],
+                    }
+                }
+            },
+        },
+    }
+    (root / 'specimens').write_text(json.dumps(specimens))
+    (root / 'atlas').mkdir()
+    regions_file = root / 'atlas' / 'regions.json'
+    regions_file.write_text(json.dumps(regions or {'regions': [{'id': 1, 'name': 'root'}]}))
+    return regions_file
+
+
+def test_regions_metadata_cached(tmp_path):
+    regions_file = make_data_root(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    first = svc.get_regions_metadata('S1')
+    assert first == {'regions': [{'id': 1, 'name': 'root'}]}
+    assert svc.get_regions_metadata('S1') is first
+    # nothing is written next to the (possibly read-only) data
+    assert os.listdir(regions_file.parent) == ['regions.json']
+
+
+def test_regions_metadata_invalidated_on_change(tmp_path):
+    regions_file = make_data_root(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    svc.get_regions_metadata('S1')
+
+    regions_file.write_text(json.dumps({'regions': [{'id': 2, 'name': 'changed region'}]}))
+    st = regions_file.stat()
+    os.utime(regions_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert svc.get_regions_metadata('S1')['regions'][0]['id'] == 2
+    assert DataService(data_root=tmp_path).get_regions_metadata('S1')['regions'][0]['id'] == 2
+
+
+def test_specimens_metadata_stat_throttled(tmp_path):
+    make_data_root(tmp_path)
+    svc = DataService(data_root=tmp_path, metadata_check_interval=3600)
+    first = svc.load_specimens_metadata()
+    (tmp_path / 'specimens').write_text(json.dumps({'S2': {'id': 'S2'}}))
+    # within the check interval the cached copy is served without a stat
+    assert svc.load_specimens_metadata() is first
+
+    svc.metadata_check_interval = 0
+    st = (tmp_path / 'specimens').stat()
+    os.utime(tmp_path / 'specimens', ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert 'S2' in svc.load_specimens_metadata()
+
+
+def test_json_bytes_follow_reload(tmp_path):
+    regions_file = make_data_root(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    assert json.loads(svc.get_regions_json_bytes('S1')) == svc.get_regions_metadata('S1')
+    assert json.loads(svc.get_specimens_json_bytes()[1])['S1']['atlas_reference'] == 'A1'
+
+    regions_file.write_text(json.dumps({'regions': []}))
+    st = regions_file.stat()
+    os.utime(regions_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert json.loads(svc.get_regions_json_bytes('S1')) == {'regions': []}
+
+
+def test_bytes_lru_bounded_by_size():
+    cache = BytesLRU(max_bytes=10)
+    cache.put('a', b'1234')
+    cache.put('b', b'5678')
+    assert cache.get('a') == b'1234'  # 'a' is now most recently used
+    cache.put('c', b'90ab')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1234' and cache.get('c') == b'90ab'
+    assert cache.nbytes == 8
+    cache.put('big', b'x' * 11)  # larger than the whole cache: not stored
+    assert cache.get('big') is None and cache.nbytes == 8
+
+
+def test_prewarm_loads_regions(tmp_path):
+    make_data_root(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    for sid in svc.load_specimens_metadata():
+        svc.prewarm(sid)
+    assert len(svc._regions_cache) == 1 and len(svc._json_bytes_cache) == 1
+
+
+def test_resolved_paths_follow_specimens_reload(tmp_path):
+    make_data_root(tmp_path)
+    specimens = json.loads((tmp_path / 'specimens').read_text())
+    specimens['S1']['mesh'] = {'m': {'data_provider': {'pathes': ['a.obj', 'b.obj'], '3d': [[0, 0, ['r1']]]}}}
+    (tmp_path / 'specimens').write_text(json.dumps(specimens))
+    (tmp_path / 'a.obj').write_text('v 0 0 0\n')
+    (tmp_path / 'b.obj').write_text('v 1 1 1\n')
+    svc = DataService(data_root=tmp_path, metadata_check_interval=0)
+    assert svc._resolve_mesh_path('S1', 'r1') == tmp_path / 'a.obj'
+    assert svc._resolved
+
+    specimens['S1']['mesh']['m']['data_provider']['3d'] = [[1, 0, ['r1']]]
+    (tmp_path / 'specimens').write_text(json.dumps(specimens))
+    st = (tmp_path / 'specimens').stat()
+    os.utime(tmp_path / 'specimens', ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert svc._resolve_mesh_path('S1', 'r1') == tmp_path / 'b.obj'
+
+
+def make_ims_specimen(root, shape=(4, 8, 8), chunks=None):
+    """Add image specimen 'I1' backed by a tiny Imaris-layout HDF5 file."""
+    data = np.arange(np.prod(shape), dtype=np.uint16).reshape(shape)
+    with h5py.File(root / 'img.ims', 'w') as f:
+        f.create_dataset('DataSet/ResolutionLevel 0/TimePoint 0/Channel 0/Data', data=data, chunks=chunks)
+    specimens_file = root / 'specimens'
+    specimens = json.loads(specimens_file.read_text()) if specimens_file.exists() else {}
+    specimens['I1'] = {'id': 'I1', 'image': {'i': {
+        'tile_size_2d': [4, 4],
+        'data_provider': {'pathes': ['img.ims'], 'xy': [[0, [0], [0]]], 'yz': [[0, [0], [0]]]},
+    }}}
+    specimens_file.write_text(json.dumps(specimens))
+    return data
+
+
+def test_tile_reads_reuse_open_handles(tmp_path):
+    data = make_ims_specimen(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    raw = svc.get_tile_bytes(svc.parse_data_id('I1:imgxy:0:0:1,4,0'))
+    tile = np.frombuffer(raw, dtype=np.float16).reshape(4, 4)
+    np.testing.assert_array_equal(tile, (data[1, 4:8, 0:4] / 65535.0).astype(np.float16))
+    n_handles = len(svc._handles)
+    assert n_handles == 2  # file + dataset
+    svc.get_tile_bytes(svc.parse_data_id('I1:imgxy:0:0:2,0,4'))
+    assert len(svc._handles) == n_handles
+    svc.close()
+    assert len(svc._handles) == 0
+
+
+def test_tile_cache_follows_specimens_reload(tmp_path):
+    make_ims_specimen(tmp_path)
+    svc = DataService(data_root=tmp_path, metadata_check_interval=0)
+    parsed = svc.parse_data_id('I1:imgxy:0:0:1,4,0')
+    version = svc.file_version(tmp_path / 'img.ims')
+    assert len(svc.get_tile_bytes(parsed, version)) == 4 * 4 * 2
+    specimens_file = tmp_path / 'specimens'
+    specimens = json.loads(specimens_file.read_text())
+    specimens['I1']['image']['i']['tile_size_2d'] = [2, 2]
+    st = specimens_file.stat()
+    specimens_file.write_text(json.dumps(specimens))
+    os.utime(specimens_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    # same image file version, but the tile is re-read at the new size
+    assert len(svc.get_tile_bytes(parsed, version)) == 2 * 2 * 2
+    svc.close()
+
+
+def test_ims_chunk_cache_sized_to_tile(tmp_path):
+    make_ims_specimen(tmp_path, shape=(4, 256, 256), chunks=(4, 256, 256))
+    svc = DataService(data_root=tmp_path)
+    svc.get_tile_bytes(svc.parse_data_id('I1:imgxy:0:0:1,4,0'))
+    dataset, = (h for h in svc._handles._items.values() if isinstance(h, h5py.Dataset))
+    # an unaligned 4x4 tile may touch 2x2 chunks of 512 KiB each
+    assert dataset.id.get_access_plist().get_chunk_cache()[1] == 4 * 4 * 256 * 256 * 2
+    svc.close()
+
+
+def test_ims_chunk_cache_within_total_budget(tmp_path, monkeypatch):
+    from app.services import data_service
+    monkeypatch.setattr(data_service, 'settings', data_service.settings.model_copy(update={
+        'h5_chunk_cache_total_bytes': 32 * 1024 * 1024, 'open_handle_cache_size': 16}))
+    make_ims_specimen(tmp_path, shape=(4, 256, 256), chunks=(4, 256, 256))
+    svc = DataService(data_root=tmp_path)
+    svc.get_tile_bytes(svc.parse_data_id('I1:imgxy:0:0:1,4,0'))
+    dataset, = (h for h in svc._handles._items.values() if isinstance(h, h5py.Dataset))
+    # 16 open datasets may share the 32 MiB budget
+    assert dataset.id.get_access_plist().get_chunk_cache()[1] == 2 * 1024 * 1024
+    svc.close()
+
+
+def test_mask_tile_png_keeps_labels(tmp_path):
+    labels = (np.arange(4 * 8 * 8) % 7).astype(np.uint8).reshape(4, 8, 8)
+    with h5py.File(tmp_path / 'msk.ims', 'w') as f:
+        f['DataSet/ResolutionLevel 0/TimePoint 0/Channel 0/Data'] = labels
+    (tmp_path / 'specimens').write_text(json.dumps({'M1': {'id': 'M1', 'region_mask': {'m': {
+        'tile_size_2d': [4, 4],
+        'data_provider': {'pathes': ['msk.ims'], 'xy': [[0, [0], [0]]]},
+    }}}}))
+    svc = DataService(data_root=tmp_path)
+    png = svc.get_tile_bytes(svc.parse_data_id('M1:mskxy:0:0:1,4,0'))
+    np.testing.assert_array_equal(np.array(PIL.Image.open(io.BytesIO(png))), labels[1, 4:8, 0:4])
+
+
+def test_u16_lut_matches_float_conversion():
+    values = np.arange(65536, dtype=np.uint16)
+    np.testing.assert_array_equal(_U16_TO_F16, (values / 65535.0).astype(np.float32).astype(np.float16))
+
+
+@pytest.mark.parametrize('dtype', ['int16', 'float32', 'uint32', 'int64', 'float64'])
+def test_tile_float_conversion_matches_float64_divide(tmp_path, dtype):
+    make_ims_specimen(tmp_path)
+    # 16785153 > 2**24 rounds differently if cast to float32 before the divide
+    tile = np.array([[0, 1, 12345, 2**15 - 1], [16785153, 2**31 - 1, 3, 65535]] * 2).astype(dtype)
+    if dtype == 'int16':
+        tile[1] = -7
+    with h5py.File(tmp_path / 'img.ims', 'w') as f:
+        f.create_dataset('DataSet/ResolutionLevel 0/TimePoint 0/Channel 0/Data', data=tile[None])
+    svc = DataService(data_root=tmp_path)
+    raw = svc.get_tile_bytes(svc.parse_data_id('I1:imgxy:0:0:0,0,0'))
+    expected = (tile / 65535.0).astype(np.float32).astype(np.float16)
+    np.testing.assert_array_equal(np.frombuffer(raw, dtype=np.float16).reshape(4, 4), expected)
+
+
+def test_prewarm_opens_image_files(tmp_path):
+    make_ims_specimen(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    svc.prewarm('I1')
+    assert len(svc._handles) == 1
+    svc.get_tile_bytes(svc.parse_data_id('I1:imgxy:0:0:0,0,0'))
+    assert len(svc._handles) == 2  # prewarmed file reused, dataset added
+    svc.close()
+
+
+def test_tile_origin_out_of_range(tmp_path):
+    make_ims_specimen(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    for coords in ('4,0,0', '-1,0,0', '0,0,-4'):
+        with pytest.raises(IndexError):
+            svc.get_tile_bytes(svc.parse_data_id(f'I1:imgxy:0:0:{coords}'))
+    svc.close()
+
+
+def test_parse_data_id_image_type():
+    svc = DataService(data_root='unused')
+    p = svc.parse_data_id('S1:imgxy:2:0:1,2,3')
+    assert (p.modality, p.view_type, p.encoding, p.res_level, p.channel) == ('img', 'xy', 'raw', 2, 0)
+    p = svc.parse_data_id('S1:meh3d-obj:::r1')
+    assert (p.modality, p.view_type, p.encoding, p.res_level) == ('meh', '3d', 'obj', None)
+    assert svc.parse_data_id('S1:msk3-zstd_v1:0::0,0,0').view_type == '3'
+    for token in ('imgxx', 'txtxy', 'imgxy-', 'imgxy_raw', 'imgxy-r.w', 'img3dx'):
+        with pytest.raises(ValueError):
+            svc.parse_data_id(f'S1:{token}:0:0:0,0,0')
+
+
+def test_index_tuple():
+    svc = DataService(data_root='unused')
+    assert svc.parse_data_id('S1:imgxy:2:0:1,20,300').index_tuple() == (1, 20, 300)
+    for coords in ('', '1,2', '1,2,3,4', 'a,2,3', ',,'):
+        with pytest.raises(ValueError):
+            svc.parse_data_id(f'S1:imgxy:0:0:{coords}').index_tuple()
+
+
+def test_prefetch_neighbor_tiles(tmp_path):
+    make_ims_specimen(tmp_path)
+    svc = DataService(data_root=tmp_path, prefetch_workers=2)
+    parsed = svc.parse_data_id('I1:imgxy:0:0:1,4,0')
+    version = svc.file_version(tmp_path / 'img.ims')
+    svc.get_tile_bytes(parsed, version)
+    svc._prefetch_pool.shutdown(wait=True)
+    for pos in ('0,4,0', '2,4,0', '1,0,0', '1,4,4'):
+        key = svc._tile_key(svc.parse_data_id(f'I1:imgxy:0:0:{pos}'), version)
+        assert key in svc._tile_cache, pos
+    assert not svc._prefetch_pending
+    svc.close()
+
+
+def test_tile_yz_view(tmp_path):
+    data = make_ims_specimen(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    raw = svc.get_tile_bytes(svc.parse_data_id('I1:imgyz:0:0:0,4,3'))
+    tile = np.frombuffer(raw, dtype=np.float16).reshape(4, 4)
+    np.testing.assert_array_equal(tile, (data[0:4, 4:8, 3] / 65535.0).astype(np.float16))
+
+
+def make_zarr_specimen(root, shape=(1, 4, 8, 8)):
+    """Add image specimen 'Z1' backed by a tiny (channel, z, y, x) zarr group."""
+    data = np.arange(np.prod(shape), dtype=np.uint16).reshape(shape)
+    group = zarr.open_group(root / 'img.zarr', mode='w')
+    group.create_array('0', shape=shape, chunks=(1, 2, 4, 4), dtype='uint16')[:] = data
+    specimens_file = root / 'specimens'
+    specimens = json.loads(specimens_file.read_text()) if specimens_file.exists() else {}
+    specimens['Z1'] = {'id': 'Z1', 'image': {'i': {
+        'tile_size_2d': [4, 4],
+        'data_provider': {'pathes': ['img.zarr'], 'xy': [[0, [0], [0]]]},
+    }}}
+    specimens_file.write_text(json.dumps(specimens))
+    return data
+
+
+def test_zarr_edge_tile_zero_padded(tmp_path):
+    data = make_zarr_specimen(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    tile = svc._read_tile(tmp_path / 'img.zarr', 'xy', ('0', 0, (1, 6, 5), (4, 4)))
+    expected = np.zeros((4, 4), dtype=np.uint16)
+    expected[:2, :3] = data[0, 1, 6:8, 5:8]
+    np.testing.assert_array_equal(tile, expected)
+    np.testing.assert_array_equal(svc._read_tile(tmp_path / 'img.zarr', 'xy', ('0', 0, (2, 4, 4), (4, 4))),
+                                  data[0, 2, 4:8, 4:8])
+    assert not svc._read_tile(tmp_path / 'img.zarr', 'xy', ('0', 0, (0, 8, 0), (4, 4))).any()
+
+
+def test_zarr_version_follows_level_metadata(tmp_path):
+    make_zarr_specimen(tmp_path)
+    svc = DataService(data_root=tmp_path)
+    parsed = svc.parse_data_id('Z1:imgxy:0:0:0,0,0')
+    data_path = svc.get_data_path(parsed)
+    version = svc.get_data_version(parsed, data_path)
+    svc.get_tile_bytes(parsed, version)
+    dir_version = svc.file_version(data_path)
+    # rewriting chunks leaves the store directory unchanged ...
+    zarr.open_group(data_path, mode='r+')['0'][:] = 7
+    assert svc.file_version(data_path) == dir_version
+    # ... so the level's zarr.json versions its tiles once touched
+    level_meta = data_path / '0' / 'zarr.json'
+    st = level_meta.stat()
+    os.utime(level_meta, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    new_version = svc.get_data_version(parsed, data_path)
+    assert new_version != version
+    raw = svc.get_tile_bytes(parsed, new_version)
+    assert (np.frombuffer(raw, dtype=np.float16) == np.float16(7 / 65535)).all()
+
+
+def test_recent_failure_keeps_message(tmp_path):
+    svc = DataService(data_root=tmp_path, negative_cache_ttl=60)
+    err = FileNotFoundError(2, 'No such file or directory', str(tmp_path / 'img.ims'))
+    svc.remember_failure('I1:imgxy:0:0:0,0,0', err)
+    assert svc.recent_failure('I1:imgxy:0:0:0,0,0') == str(err)
+    assert svc.recent_failure('I1:imgxy:0:0:0,0,4') is None
@@ -0,0 +1,27 @@
+"""Tests for the queue-based logging set up in app.main."""
+
+import sys, os, io, logging, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import main  # noqa
+
+
+def test_log_records_written_without_lifespan():
+    # no TestClient context: the app's lifespan has not run
+    buf = io.StringIO()
+    old_stream = main._log_stream.setStream(buf)
+    # pytest's own capture handlers make basicConfig a no-op at import time,
+    # so attach the app's queue handler directly
+    test_logger = logging.getLogger('app.test_main_logging')
+    test_logger.addHandler(main._log_queue_handler)
+    test_logger.propagate = False
+    try:
+        test_logger.warning('record outside lifespan')
+        deadline = time.monotonic() + 5
+        while 'record outside lifespan' not in buf.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        test_logger.removeHandler(main._log_queue_handler)
+        main._log_stream.setStream(old_stream)
+    assert 'record outside lifespan' in buf.getvalue()
@@ -17,6 +17,13 @@ from app.main import app  # noqa
 client = TestClient(app)
 
 
+@pytest.fixture(scope='module', autouse=True)
+def app_lifespan():
+    # run startup/shutdown so app.state.data_service exists
+    with client:
+        yield
+
+
 def test_health():
     r = client.get('/health')
     assert r.status_code == 200
@@ -36,6 +43,42 @@ def test_metadata_specimens():
     assert "RAS_coordinate" in sa['image']['recon-v2']
 
 
+def test_metadata_specimens_etag():
+    r = client.get('/metadata', params={'type': 'specimens'})
+    assert r.status_code == 200
+    etag = r.headers.get('etag')
+    assert etag and etag.startswith('W/"')
+
+    r2 = client.get('/metadata', params={'type': 'specimens'}, headers={'If-None-Match': etag})
+    assert r2.status_code == 304
+    assert r2.headers.get('etag') == etag
+    assert r2.content == b''
+
+
+def test_metadata_specimens_etag_matches_cached_body(tmp_path):
+    from app.api.new_api import get_data_service
+    from app.services.data_service import DataService
+    (tmp_path / 'specimens').write_text(json.dumps({'S1': {'v': 1}}))
+    svc = DataService(data_root=tmp_path, metadata_check_interval=3600)
+    app.dependency_overrides[get_data_service] = lambda: svc
+    try:
+        r = client.get('/metadata', params={'type': 'specimens'})
+        etag = r.headers['etag']
+        # modified within the check interval: the cached body is still served,
+        # so the ETag must not change either
+        (tmp_path / 'specimens').write_text(json.dumps({'S1': {'v': 2, 'x': 0}}))
+        r2 = client.get('/metadata', params={'type': 'specimens'})
+        assert r2.json() == {'S1': {'v': 1}}
+        assert r2.headers['etag'] == etag
+        svc._specimens_checked_at = float('-inf')
+        r3 = client.get('/metadata', params={'type': 'specimens'}, headers={'If-None-Match': etag})
+        assert r3.status_code == 200
+        assert r3.json() == {'S1': {'v': 2, 'x': 0}}
+        assert r3.headers['etag'] != etag
+    finally:
+        app.dependency_overrides.pop(get_data_service, None)
+
+
 def test_metadata_regions():
     r = client.get('/metadata', params={'type': 'regions', 'specimen': 'RM009'})
     if r.status_code == 404:
@@ -168,3 +211,111 @@ def test_json_compression():
     # Ensure decompressed bytes are valid JSON
     data = json.loads(decompressed)
     assert isinstance(data, dict)
+
+
+def test_data_mesh_from_file(tmp_path):
+    from app.api.new_api import get_data_service
+    from app.services.data_service import DataService
+    specimens = {'S1': {'mesh': {'m': {'data_provider': {
+        'pathes': ['brain_shell.obj'], '3d': [[0, [0], ['brain_shell']]]}}}}}
+    (tmp_path / 'specimens').write_text(json.dumps(specimens))
+    obj = b'# mesh\nv 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n'
+    (tmp_path / 'brain_shell.obj').write_bytes(obj)
+
+    app.dependency_overrides[get_data_service] = lambda: DataService(data_root=tmp_path)
+    try:
+        r = client.get('/data/S1:meh3d:::brain_shell')
+        assert r.status_code == 200
+        assert 'text/plain' in r.headers['content-type']
+        assert r.content == obj
+        etag = r.headers['etag']
+        r2 = client.get('/data/S1:meh3d:::brain_shell', headers={'If-None-Match': etag})
+        assert r2.status_code == 304
+    finally:
+        app.dependency_overrides.pop(get_data_service, None)
+
+
+def test_data_not_found_remembered(tmp_path):
+    from app.api.new_api import get_data_service
+    from app.services.data_service import DataService
+    (tmp_path / 'specimens').write_text(json.dumps({'S1': {'mesh': {'m': {'data_provider': {
+        'pathes': ['brain_shell.obj'], '3d': [[0, [0], ['brain_shell']]]}}}}}))
+    svc = DataService(data_root=tmp_path)
+    app.dependency_overrides[get_data_service] = lambda: svc
+    try:
+        r = client.get('/data/S1:meh3d:::brain_shell')
+        assert r.status_code == 404
+        # the file appearing is only noticed once the entry expires
+        (tmp_path / 'brain_shell.obj').write_bytes(b'v 0 0 0\n')
+        r2 = client.get('/data/S1:meh3d:::brain_shell')
+        assert r2.status_code == 404
+        assert r2.json() == r.json()
+        svc._failures.clear()
+        assert client.get('/data/S1:meh3d:::brain_shell').status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_data_service, None)
+
+
+def test_coalesced_runs_once_for_concurrent_callers():
+    import asyncio, threading
+    from app.api import new_api
+
+    calls = []
+    release = threading.Event()
+
+    def slow(x):
+        calls.append(x)
+        release.wait(5)
+        return x * 2
+
+    async def main():
+        tasks = [asyncio.create_task(new_api._coalesced(('k',), slow, 21)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == [42] * 4
+    assert calls == [21]
+    assert not new_api._inflight
+
+
+def test_coalesced_follower_survives_leader_cancel():
+    import asyncio, threading
+    from app.api import new_api
+
+    release = threading.Event()
+
+    def slow(x):
+        release.wait(5)
+        return x * 2
+
+    async def main():
+        leader = asyncio.create_task(new_api._coalesced(('c',), slow, 21))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(new_api._coalesced(('c',), slow, 21))
+        await asyncio.sleep(0.05)
+        leader.cancel()  # e.g. the first client disconnected
+        await asyncio.sleep(0.05)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == 42
+    assert not new_api._inflight
+
+
+def test_cors_preflight_max_age():
+    r = client.options('/metadata', headers={
+        'Origin': 'http://localhost:5173',
+        'Access-Control-Request-Method': 'GET',
+    })
+    assert r.status_code == 200
+    assert r.headers['access-control-max-age'] == '86400'
+
+
+def test_openapi_disabled_without_debug():
+    from app.config import settings
+    if settings.debug:
+        pytest.skip('docs enabled in debug mode')
+    assert client.get('/openapi.json').status_code == 404
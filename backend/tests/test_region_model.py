@@ -0,0 +1,59 @@
+"""Tests for the RegionHierarchy lookup helpers in app.models.region."""
+
+import sys, os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.models.region import Region, RegionHierarchy  # noqa
+
+
+def make_region(id, name, abbreviation, levels, value):
+    return {'id': id, 'name': name, 'abbreviation': abbreviation, 'value': value,
+            **{f'level{i + 1}': lv for i, lv in enumerate(levels)}}
+
+
+def make_hierarchy():
+    regions = [
+        make_region(1, 'Forebrain', 'FB', ('Forebrain', '', '', ''), 10),
+        make_region(2, 'Cerebral cortex', 'CTX', ('Forebrain', 'Cortex', '', ''), 20),
+        make_region(3, 'Primary visual area', 'V1', ('Forebrain', 'Cortex', 'Occipital', 'V1'), 30),
+        make_region(4, 'Secondary visual area', 'V2', ('Forebrain', 'Cortex', 'Occipital', 'V2'), 40),
+    ]
+    return RegionHierarchy(
+        metadata={},
+        regions=regions,
+        hierarchy={},
+        region_lookup={str(r['id']): r for r in regions},
+    )
+
+
+def test_regions_by_level():
+    h = make_hierarchy()
+    assert [r.id for r in h.get_regions_by_level(1)] == [1]
+    assert [r.id for r in h.get_regions_by_level(2)] == [2]
+    assert [r.id for r in h.get_regions_by_level(4)] == [3, 4]
+    assert h.get_regions_by_level(0) == [] and h.get_regions_by_level(5) == []
+
+
+def test_search_regions():
+    h = make_hierarchy()
+    assert [r.id for r in h.search_regions('visual')] == [3, 4]
+    assert [r.id for r in h.search_regions('ctx')] == [2]
+    assert h.search_regions('nothing') == []
+    # name and abbreviation both match: reported once
+    assert [r.id for r in h.search_regions('V')] == [3, 4]
+    assert len(h.search_regions('')) == 4
+    assert h.search_regions('fb\nforebrain') == []
+
+
+def test_region_lookup():
+    h = make_hierarchy()
+    assert h.get_region_by_id(3).abbreviation == 'V1'
+    assert h.get_region_by_value(40).id == 4
+    assert h.get_region_by_value(99) is None
+
+
+def test_region_by_value():
+    h = make_hierarchy()
+    assert h.get_region_by_value(30).id == 3
+    assert h.get_region_by_value(0) is None
@@ -0,0 +1,88 @@
+import sys, os
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.util.zarr3_fs_reader import zarr3_reader  # noqa
+
+
+def make_sharded_zarr(root, shape=(1, 8, 16, 16)):
+    """Sharded, blosc-compressed zarr v3 group with a single array '0'."""
+    import zarr
+    from zarr.codecs import BloscCodec
+    data = np.arange(np.prod(shape), dtype=np.uint16).reshape(shape)
+    group = zarr.open_group(root / 'img.zarr', mode='w')
+    array = group.create_array('0', shape=shape, chunks=(1, 2, 4, 4), shards=(1, 4, 8, 8),
+                               dtype='uint16', compressors=BloscCodec(cname='zstd', clevel=1))
+    array[:] = data
+    return root / 'img.zarr', data
+
+
+def test_read_chunk(tmp_path):
+    zarr_path, data = make_sharded_zarr(tmp_path)
+    reader = zarr3_reader(zarr_path)
+    for coor in [(0, 0, 0, 0), (0, 2, 4, 8), (0, 6, 12, 12)]:
+        chunk = reader.read_chunk('0', coor)
+        np.testing.assert_array_equal(chunk, data[0:1, coor[1]:coor[1]+2, coor[2]:coor[2]+4, coor[3]:coor[3]+4])
+    assert reader.exists_chunk('0', (0, 4, 8, 8))
+    # small shards: index cached as uint32
+    assert all(a.dtype == np.uint32 for a in reader._index_array_cache.values())
+
+
+def test_read_chunks_matches_read_chunk(tmp_path):
+    zarr_path, data = make_sharded_zarr(tmp_path)
+    (zarr_path / '0' / 'c' / '0' / '1' / '1' / '1').unlink()
+    reader = zarr3_reader(zarr_path)
+    coors = [(0, z, y, x) for z in (6, 0, 2) for y in (12, 0, 4) for x in (8, 4)]
+    for chunk, coor in zip(reader.read_chunks('0', coors), coors):
+        np.testing.assert_array_equal(chunk, reader.read_chunk('0', coor))
+    assert reader.read_chunks('0', coors, b_decode=False) == \
+        [reader.read_chunk('0', coor, b_decode=False) for coor in coors]
+    parallel = zarr3_reader(zarr_path, decode_workers=2)
+    for chunk, coor in zip(parallel.read_chunks('0', coors), coors):
+        np.testing.assert_array_equal(chunk, reader.read_chunk('0', coor))
+    parallel.close()
+
+
+def test_shard_files_reused_and_bounded(tmp_path):
+    zarr_path, data = make_sharded_zarr(tmp_path)
+    reader = zarr3_reader(zarr_path, max_open_shards=2)
+    reader.read_chunk('0', (0, 0, 0, 0))
+    shard_fd = reader._shard_files[('0', (0, 0, 0, 0))]
+    reader.read_chunk('0', (0, 2, 4, 4))  # same shard
+    assert len(reader._shard_files) == 1
+    assert reader._shard_files[('0', (0, 0, 0, 0))] is shard_fd
+    for coor in [(0, 4, 0, 0), (0, 0, 8, 0), (0, 0, 0, 8)]:
+        reader.read_chunk('0', coor)
+    assert len(reader._shard_files) == 2
+
+
+def test_missing_shard_reads_fill_value(tmp_path):
+    import zarr
+    zarr_path, data = make_sharded_zarr(tmp_path)
+    # all-fill chunks are not stored; their index entries are all-ones
+    zarr.open_group(zarr_path, mode='r+')['0'][0, 0:2, 4:8, 0:4] = 0
+    reader = zarr3_reader(zarr_path)
+    assert not reader.exists_chunk('0', (0, 0, 4, 0))
+    assert not reader.read_chunk('0', (0, 0, 4, 0)).any()
+    assert reader.exists_chunk('0', (0, 0, 0, 0))
+    (zarr_path / '0' / 'c' / '0' / '1' / '1' / '1').unlink()
+    reader = zarr3_reader(zarr_path)
+    assert not reader.read_chunk('0', (0, 4, 8, 8)).any()
+    assert not reader.exists_chunk('0', (0, 4, 8, 8))
+
+
+def test_verify_index_detects_corruption(tmp_path):
+    import pytest
+    from app.util import zarr3_fs_reader
+    if zarr3_fs_reader.crc32c is None:
+        pytest.skip('no crc32c implementation installed')
+    zarr_path, data = make_sharded_zarr(tmp_path)
+    reader = zarr3_reader(zarr_path, verify_index=True)
+    np.testing.assert_array_equal(reader.read_chunk('0', (0, 0, 0, 0)), data[0:1, 0:2, 0:4, 0:4])
+    shard = zarr_path / '0' / 'c' / '0' / '1' / '0' / '0'
+    raw = bytearray(shard.read_bytes())
+    raw[-5] ^= 0xFF  # last byte of the index
+    shard.write_bytes(bytes(raw))
+    with pytest.raises(ValueError):
+        reader.read_chunk('0', (0, 4, 0, 0))